@@ -0,0 +1,98 @@
+"""
+Measures recall@k and query latency of the LSH recommendation index against
+exact cosine similarity.
+
+Usage (from the repository root):
+    python Model/evaluate_ann.py --model backend/model [--k 10] [--queries 500]
+    python Model/evaluate_ann.py --synthetic 100000 [--tables 32] [--bits 10]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+from ann import LSHIndex
+from model_store import resolve_model_dir
+from neighbors import top_k_rows
+
+
+def synthetic_vectors(n, dims=5000, topics=400, seed=0):
+    """
+    Clustered bag-of-words vectors: every movie mixes terms of one or two topics
+    with a few random terms, roughly like the tag vectors of real movies.
+    """
+    rng = np.random.default_rng(seed)
+    topic_terms = rng.integers(0, dims, size=(topics, 30))
+    rows, cols = [], []
+    for i in range(n):
+        for topic in rng.integers(0, topics, size=rng.integers(1, 3)):
+            terms = rng.choice(topic_terms[topic], size=12, replace=False)
+            cols.extend(terms)
+            rows.extend([i] * len(terms))
+        noise = rng.integers(0, dims, size=8)
+        cols.extend(noise)
+        rows.extend([i] * len(noise))
+    counts = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, dims))
+    return normalize(counts)
+
+
+def percentile(samples, p):
+    return float(np.percentile(samples, p)) if len(samples) else 0.0
+
+
+def evaluate(index, k, queries, seed=0):
+    vectors = index.vectors
+    n = vectors.shape[0]
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n, size=min(queries, n), replace=False)
+
+    exact_ms, ann_ms, recalls, candidates = [], [], [], []
+    for row in sample:
+        started = time.perf_counter()
+        scores = (vectors[row] @ vectors.T).toarray()
+        exact, _ = top_k_rows(scores, k, row_offset=row)
+        exact_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        approx, _ = index.query(row, k)
+        ann_ms.append((time.perf_counter() - started) * 1000)
+
+        recalls.append(len(set(exact[0].tolist()) & set(approx.tolist())) / max(1, len(exact[0])))
+        candidates.append(len(index.candidates(row)))
+
+    print(f"movies: {n}, tables: {index.n_tables}, bits: {index.n_bits}, queries: {len(sample)}")
+    print(f"recall@{k}: {np.mean(recalls):.3f} (min {np.min(recalls):.2f})")
+    print(f"candidates per query: mean {np.mean(candidates):.0f} ({np.mean(candidates) / n:.2%} of catalog)")
+    print(f"exact latency ms: p50 {percentile(exact_ms, 50):.2f}  p99 {percentile(exact_ms, 99):.2f}")
+    print(f"ann latency ms:   p50 {percentile(ann_ms, 50):.2f}  p99 {percentile(ann_ms, 99):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the LSH index against exact similarity.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--model', help="Published model root or directory built with --ann")
+    source.add_argument('--synthetic', type=int, metavar='N', help="Build an index over N synthetic movies")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--tables', type=int, default=32)
+    parser.add_argument('--bits', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.model:
+        index = LSHIndex.open(resolve_model_dir(args.model))
+        if index is None:
+            sys.exit(f"No ANN index in {args.model}; build the model with --ann")
+    else:
+        started = time.perf_counter()
+        index = LSHIndex.build(synthetic_vectors(args.synthetic), n_tables=args.tables, n_bits=args.bits)
+        print(f"Built synthetic index in {time.perf_counter() - started:.1f}s")
+    evaluate(index, args.k, args.queries)
+
+
+if __name__ == '__main__':
+    main()
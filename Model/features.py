@@ -0,0 +1,186 @@
+"""
+Integer-coded movie features for the model builder.
+
+Every field (genres, keywords, cast, director, overview terms) has its own
+vocabulary, and the whole catalog is encoded into one CSR matrix of counts
+whose columns are grouped by field: a genre "Drama" and the word "drama" in
+an overview are different features. Names are single features instead of
+being joined and re-tokenized, and each field is encoded for all movies at
+once (one factorize over the field's tokens).
+
+Per-field weights scale the counts of a field before rows are L2-normalized,
+so the weights decide how much each field contributes to the cosine
+similarity. Counts and weights are stored separately, so an incremental
+build can re-encode changed movies with the vocabulary and weights of the
+full build.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+
+FIELDS = ('genres', 'keywords', 'cast', 'director', 'overview')
+DEFAULT_WEIGHTS = {field: 1.0 for field in FIELDS}
+
+# Names taken per movie from the list fields, as for the old tag text
+NAMES_PER_FIELD = 3
+
+# Most frequent terms kept per field (None keeps all). Terms of a single movie
+# are dropped too: they cannot make two movies similar.
+MAX_TERMS = {'genres': None, 'keywords': 5000, 'cast': 5000, 'director': 2000, 'overview': 5000}
+MIN_MOVIES = 2
+
+# CountVectorizer's default token pattern
+TOKEN_PATTERN = r'(?u)\b\w\w+\b'
+
+
+def parse_weights(text):
+    """
+    Parses 'director=2,overview=0.5' into a full weight dict; unnamed fields keep weight 1.
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        field, _, value = item.partition('=')
+        field = field.strip()
+        if field not in weights:
+            raise ValueError(f"Unknown feature field '{field}' (expected one of {', '.join(FIELDS)})")
+        weights[field] = float(value)
+    return weights
+
+
+def _names(items, limit=NAMES_PER_FIELD):
+    if isinstance(items, list):
+        return [item['name'].lower() for item in items[:limit]]
+    return []
+
+
+def _director(crew):
+    if isinstance(crew, list):
+        for member in crew:
+            if member.get('job') == 'Director':
+                return [member['name'].lower()]
+    return []
+
+
+def extract_fields(details):
+    """
+    Returns {field: one token list per movie} for a list of TMDB movie details
+    (with credits and keywords appended).
+    """
+    overview = pd.Series([movie.get('overview') or '' for movie in details], dtype=object)
+    terms = overview.str.lower().str.findall(TOKEN_PATTERN)
+    return {
+        'genres': [_names(movie.get('genres'), limit=None) for movie in details],
+        'keywords': [_names((movie.get('keywords') or {}).get('keywords')) for movie in details],
+        'cast': [_names((movie.get('credits') or {}).get('cast')) for movie in details],
+        'director': [_director((movie.get('credits') or {}).get('crew')) for movie in details],
+        'overview': [[term for term in movie_terms if term not in ENGLISH_STOP_WORDS] for movie_terms in terms],
+    }
+
+
+def _flatten(token_lists):
+    """
+    The tokens of all movies in one array, with the row of every token.
+    """
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    rows = np.repeat(np.arange(len(token_lists), dtype=np.int32), lengths)
+    codes, uniques = pd.factorize(pd.Series([token for tokens in token_lists for token in tokens], dtype=object))
+    return rows, codes, np.asarray(uniques, dtype=object)
+
+
+def _counts(rows, columns, n_rows, n_columns):
+    valid = columns >= 0
+    counts = sparse.csr_matrix((np.ones(int(valid.sum()), dtype=np.int32), (rows[valid], columns[valid])), shape=(n_rows, n_columns))
+    counts.sum_duplicates()
+    return counts
+
+
+def _fit_field(token_lists, max_terms, min_movies):
+    rows, codes, uniques = _flatten(token_lists)
+    # Document frequency of every distinct token
+    pairs = np.unique(rows.astype(np.int64) * len(uniques) + codes) % max(len(uniques), 1)
+    frequency = np.bincount(pairs, minlength=len(uniques))
+    kept = np.flatnonzero(frequency >= min_movies)
+    # Most frequent first, ties in alphabetical order, so a rebuild is deterministic
+    kept = kept[np.lexsort((uniques[kept].astype(str), -frequency[kept]))]
+    if max_terms is not None:
+        kept = kept[:max_terms]
+    columns = np.full(len(uniques), -1, dtype=np.int32)
+    columns[kept] = np.arange(len(kept), dtype=np.int32)
+    return uniques[kept].tolist(), _counts(rows, columns[codes], len(token_lists), len(kept))
+
+
+def _encode_field(token_lists, terms):
+    rows, codes, uniques = _flatten(token_lists)
+    index = {term: i for i, term in enumerate(terms)}
+    columns = np.fromiter((index.get(token, -1) for token in uniques), dtype=np.int32, count=len(uniques))
+    return _counts(rows, columns[codes], len(token_lists), len(terms))
+
+
+def compact_counts(counts):
+    """
+    The count matrix as stored with a model: uint16 counts, since a term never
+    occurs that often in one field of one movie, with sorted indices.
+    """
+    counts = counts.tocsr(copy=True)
+    np.minimum(counts.data, np.iinfo(np.uint16).max, out=counts.data)
+    counts.sort_indices()
+    return counts.astype(np.uint16)
+
+
+class FeatureVocabulary:
+    """
+    Per-field term lists and weights; a term's feature id is its field's
+    offset plus its position in the list.
+    """
+
+    def __init__(self, terms, weights=None):
+        self.terms = {field: list(terms.get(field, [])) for field in FIELDS}
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+
+    def __len__(self):
+        return sum(len(terms) for terms in self.terms.values())
+
+    @classmethod
+    def fit(cls, fields, weights=None, max_terms=MAX_TERMS, min_movies=MIN_MOVIES):
+        """
+        Builds the vocabularies from extract_fields() output. Returns the
+        vocabulary and the catalog's count matrix.
+        """
+        terms = {}
+        blocks = []
+        for field in FIELDS:
+            terms[field], counts = _fit_field(fields[field], max_terms.get(field), min_movies)
+            blocks.append(counts)
+        return cls(terms, weights), sparse.hstack(blocks, format='csr', dtype=np.int32)
+
+    def encode(self, fields):
+        """
+        The count matrix of extract_fields() output; unknown terms are ignored.
+        """
+        return sparse.hstack([_encode_field(fields[field], self.terms[field]) for field in FIELDS], format='csr', dtype=np.int32)
+
+    def column_weights(self):
+        return np.repeat(np.asarray([self.weights[field] for field in FIELDS], dtype=np.float32),
+                         [len(self.terms[field]) for field in FIELDS])
+
+    def vectors(self, counts):
+        """
+        Weighted, L2-normalized float32 rows, whose dot products are cosines.
+        """
+        weighted = counts.tocsr().astype(np.float32)
+        weighted.data *= self.column_weights()[weighted.indices]
+        return normalize(weighted)
+
+    def to_json(self):
+        return {'fields': self.terms, 'weights': self.weights}
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Returns None for the flat term -> column vocabulary of tag-text models.
+        """
+        if 'fields' not in data:
+            return None
+        return cls(data['fields'], data.get('weights'))
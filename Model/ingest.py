@@ -0,0 +1,224 @@
+"""
+Concurrent, resumable TMDB ingestion for the model builder.
+
+Requests run on a thread pool behind a shared token-bucket rate limiter,
+transient failures are retried with exponential backoff, and every fetched
+page and movie is appended to an on-disk checkpoint so an interrupted run
+picks up where it stopped.
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+import requests
+from requests.adapters import HTTPAdapter
+
+TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+
+# HTTP statuses worth retrying; anything else (e.g. 404) fails immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest date range /movie/changes accepts in one request
+CHANGES_WINDOW_DAYS = 14
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines checkpoint of fetched pages and movie details.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self.pages = self._load('pages.jsonl', 'page')
+        self.details = self._load('details.jsonl', 'id')
+
+    def _load(self, name, key):
+        records = {}
+        file_path = os.path.join(self.path, name)
+        if os.path.exists(file_path):
+            with open(file_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by an interrupted run
+                    records[record[key]] = record
+        return records
+
+    def _append(self, name, record):
+        with self._lock:
+            with open(os.path.join(self.path, name), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def add_page(self, page, results):
+        record = {'page': page, 'results': results}
+        self._append('pages.jsonl', record)
+        self.pages[page] = record
+
+    def add_details(self, details):
+        self._append('details.jsonl', details)
+        self.details[details['id']] = details
+
+
+class IngestStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.resumed = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, field, n=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"{self.requests} requests ({self.retries} retries, {self.failures} failed, "
+                f"{self.resumed} resumed from checkpoint) in {elapsed:.1f}s "
+                f"= {self.requests / elapsed if elapsed else 0:.1f} req/s")
+
+
+class Ingestor:
+    """
+    Fetches popular movie pages and movie details from TMDB.
+    """
+
+    def __init__(self, api_key, checkpoint_dir, base_url=TMDB_BASE_URL, workers=8, rate=40.0, max_retries=5, timeout=10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.workers = workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate)
+        self.checkpoint = Checkpoint(checkpoint_dir)
+        self.stats = IngestStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path, **params):
+        """
+        GET with rate limiting and retries. Returns the JSON body or raises.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.stats.add('requests')
+            try:
+                response = self.session.get(f"{self.base_url}{path}", params={'api_key': self.api_key, **params}, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                retry_after = response.headers.get('Retry-After')
+                error = requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry_after = None
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            self.stats.add('retries')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else min(30, 0.5 * 2 ** attempt)
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+    def _run(self, jobs, fn, label):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(fn, job): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    future.result()
+                except (requests.RequestException, ValueError) as e:
+                    self.stats.add('failures')
+                    print(f"Error fetching {label} {futures[future]}: {e}")
+                if done % 100 == 0 or done == len(futures):
+                    print(f"Fetched {done}/{len(futures)} {label}s...")
+
+    def fetch_popular(self, num_pages):
+        """
+        Returns the movies of the first `num_pages` popular pages, in page order.
+        """
+        todo = [p for p in range(1, num_pages + 1) if p not in self.checkpoint.pages]
+        self.stats.add('resumed', num_pages - len(todo))
+
+        def fetch(page):
+            self.checkpoint.add_page(page, self.get('/movie/popular', page=page)['results'])
+
+        self._run(todo, fetch, 'page')
+        movies = []
+        for page in range(1, num_pages + 1):
+            if page in self.checkpoint.pages:
+                movies.extend(self.checkpoint.pages[page]['results'])
+        return movies
+
+    def fetch_details(self, movie_ids):
+        """
+        Returns the details (with credits and keywords) of every movie that could be fetched.
+        """
+        todo = [m for m in dict.fromkeys(movie_ids) if m not in self.checkpoint.details]
+        self.stats.add('resumed', len(set(movie_ids)) - len(todo))
+
+        def fetch(movie_id):
+            self.checkpoint.add_details(self.get(f'/movie/{movie_id}', append_to_response='credits,keywords'))
+
+        self._run(todo, fetch, 'movie')
+        return [self.checkpoint.details[m] for m in dict.fromkeys(movie_ids) if m in self.checkpoint.details]
+
+    def fetch_changes(self, start_date, end_date=None):
+        """
+        Returns the ids of movies TMDB reports as changed between `start_date`
+        and `end_date` (YYYY-MM-DD, default today).
+
+        TMDB caps the endpoint at CHANGES_WINDOW_DAYS per request, so longer
+        ranges are split into consecutive windows. Not checkpointed: the list
+        is small and must be current.
+        """
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date) if end_date else datetime.now(timezone.utc).date()
+        ids = set()
+        while start <= end:
+            window_end = min(end, start + timedelta(days=CHANGES_WINDOW_DAYS - 1))
+            ids.update(self._fetch_changes_window(start.isoformat(), window_end.isoformat()))
+            start = window_end + timedelta(days=1)
+        return ids
+
+    def _fetch_changes_window(self, start_date, end_date):
+        params = {'start_date': start_date, 'end_date': end_date}
+        first = self.get('/movie/changes', page=1, **params)
+        ids = {item['id'] for item in first.get('results', [])}
+        pages = range(2, first.get('total_pages', 1) + 1)
+        if pages:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for data in pool.map(lambda p: self.get('/movie/changes', page=p, **params), pages):
+                    ids.update(item['id'] for item in data.get('results', []))
+        return ids
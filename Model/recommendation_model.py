@@ -1,132 +1,332 @@
-import requests
+import argparse
+import json
 import pandas as pd
-import time
-import joblib
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+import shutil
+from datetime import datetime, timezone
+from scipy import sparse
 from dotenv import load_dotenv
 import os
+import sys
 
 load_dotenv()
 
+# The neighbor table format is owned by the backend, which loads it at runtime.
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+from neighbors import NeighborIndex, top_k_rows, DEFAULT_K
+from model_store import open_artifacts, publish_version, resolve_model_dir, save_artifacts
+from ingest import Ingestor
+from features import FIELDS, FeatureVocabulary, compact_counts, extract_fields, parse_weights
+from ann import LSHIndex
+from similarity import DEFAULT_BLOCK_MB, Timer, block_rows, peak_rss_mb, sparse_top_k
+
 # --- Replace with your actual TMDB API key ---
 API_KEY = os.getenv('API_KEY')
 
-# Use a Session object for connection pooling and headers
-session = requests.Session()
-session.headers.update({
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-})
-
-def fetch_movie_data(api_key, num_pages=250):
-    all_movies = []
-    base_url = "https://api.themoviedb.org/3/movie/popular"
-    for page in range(1, num_pages + 1):
-        print(f"Fetching popular movies page {page}/{num_pages}...")
-        try:
-            response = session.get(base_url, params={'api_key': api_key, 'page': page}, timeout=10)
-            response.raise_for_status()  # This will raise an exception for HTTP errors
-            all_movies.extend(response.json()['results'])
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching page {page}: {e}")
-            # Optional: break the loop if one page fails
-            break
-        time.sleep(0.1)
-    return pd.DataFrame(all_movies)
-
-def get_movie_details(movie_id, api_key):
-    base_url = f"https://api.themoviedb.org/3/movie/{movie_id}"
+# Number of precomputed neighbors stored per movie
+NEIGHBORS_K = int(os.getenv('NEIGHBORS_K', DEFAULT_K))
+
+# Whether to write the fetched details into the API's local movie catalog
+SAVE_CATALOG = os.getenv('SAVE_CATALOG', '1') == '1'
+
+# Ingestion: concurrent workers sharing a token bucket sized to TMDB's rate limit.
+# Fetched pages and details are checkpointed so an interrupted run resumes.
+NUM_PAGES = int(os.getenv('NUM_PAGES', '150'))
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '8'))
+INGEST_RATE = float(os.getenv('INGEST_RATE', '40'))
+CHECKPOINT_DIR = os.getenv('INGEST_CHECKPOINT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ingest_checkpoint'))
+
+# Versioned model root the API opens (see model_store.publish_version)
+MODEL_DIR = os.getenv('MODEL_DIR', os.path.join(BACKEND_DIR, 'model'))
+
+# Per-field feature weights, e.g. "director=2,overview=0.5" (unnamed fields
+# keep 1). Incremental builds keep the weights of the last full build.
+FEATURE_WEIGHTS = parse_weights(os.getenv('FEATURE_WEIGHTS', ''))
+
+# Builder state stored next to the served arrays so the next run can be incremental
+VOCABULARY_FILE = 'vocabulary.json'
+VECTORS_FILE = 'vectors.npz'
+
+# Rows per block when scoring unchanged movies against updated ones
+BLOCK_SIZE = 2048
+
+# Similarity stage: memory budget of one dense score block and worker processes
+SIMILARITY_BLOCK_MB = int(os.getenv('SIMILARITY_BLOCK_MB', DEFAULT_BLOCK_MB))
+SIMILARITY_WORKERS = int(os.getenv('SIMILARITY_WORKERS', '1'))
+
+# Approximate nearest-neighbor (LSH) index shape, used with --ann
+ANN_TABLES = int(os.getenv('ANN_TABLES', '32'))
+ANN_BITS = int(os.getenv('ANN_BITS', '10'))
+
+ingestor = Ingestor(API_KEY, CHECKPOINT_DIR, workers=INGEST_WORKERS, rate=INGEST_RATE)
+
+def fetch_movie_data(num_pages=250):
+    movies = ingestor.fetch_popular(num_pages)
+    return pd.DataFrame(movies).drop_duplicates(subset='id') if movies else pd.DataFrame()
+
+def save_catalog(all_details):
+    """
+    Persists the fetched movie details into the `movies` table of the app database.
+    """
     try:
-        response = session.get(base_url, params={'api_key': api_key, 'append_to_response': 'credits,keywords'}, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching details for movie ID {movie_id}: {e}")
-        return None
+        import models
+        import crud
+        from database import SessionLocal, engine
+        models.Base.metadata.create_all(bind=engine, tables=[models.Movie.__table__])
+        db = SessionLocal()
+        try:
+            count = crud.upsert_movies(db, all_details)
+        finally:
+            db.close()
+        print(f"Saved {count} movies to the local catalog.")
+    except Exception as e:
+        print(f"Could not save the local catalog: {e}")
 
-# --- Main script execution ---
+def select_details(movies_df, all_details):
+    """
+    The details of the movies in `movies_df`, in its order. Movies whose
+    details could not be fetched are left out.
+    """
+    details_by_id = {movie['id']: movie for movie in all_details}
+    return [details_by_id[movie_id] for movie_id in movies_df['id'].tolist() if movie_id in details_by_id]
 
-# Step 1: Fetch initial list of popular movies
-movies_df = fetch_movie_data(API_KEY, num_pages=150)
+def describe_features(vocabulary, counts):
+    sizes = ", ".join(f"{field} {len(vocabulary.terms[field])} (x{vocabulary.weights[field]:g})" for field in FIELDS)
+    print(f"Features: {sizes}; {counts.nnz} non-zeros")
 
-if not movies_df.empty:
-    # Step 2: Fetch details for each movie
-    all_details = []
-    total_movies = len(movies_df)
-    for i, movie_id in enumerate(movies_df['id']):
-        print(f"Fetching details for movie {i+1}/{total_movies} (ID: {movie_id})...")
-        details = get_movie_details(movie_id, API_KEY)
-        if details:
-            all_details.append(details)
-        time.sleep(0.1) # IMPORTANT: Add delay here too!
+def load_previous_model(model_dir):
+    """
+    Returns the previous build (artifacts, vocabulary, feature counts), or None
+    if there is no published model with builder state.
+    """
+    version_dir = resolve_model_dir(model_dir)
+    vocabulary_path = os.path.join(version_dir, VOCABULARY_FILE)
+    vectors_path = os.path.join(version_dir, VECTORS_FILE)
+    if not (os.path.exists(vocabulary_path) and os.path.exists(vectors_path)):
+        return None
+    with open(vocabulary_path) as f:
+        vocabulary = FeatureVocabulary.from_json(json.load(f))
+    if vocabulary is None:
+        print("The published model was built from tag text, without per-field features.")
+        return None
+    return {
+        'artifacts': open_artifacts(model_dir),
+        'vocabulary': vocabulary,
+        'counts': sparse.load_npz(vectors_path).tocsr(),
+    }
 
-    details_df = pd.json_normalize(all_details)
-    
-    # Merge the dataframes carefully
-    # Ensure columns don't clash by dropping duplicates from the original df
-    movies_df = movies_df.drop(columns=[col for col in details_df.columns if col in movies_df.columns and col != 'id'], errors='ignore')
-    movies_df = pd.merge(movies_df, details_df, on='id', how='inner')
+def _recompute_rows(vectors, rows, k, indices, scores):
+    """
+    Fills the exact top-k of `rows` into `indices` and `scores`, in row blocks.
+    """
+    step = block_rows(vectors.shape[0], SIMILARITY_BLOCK_MB)
+    for start in range(0, len(rows), step):
+        block_ids = rows[start:start + step]
+        block = (vectors[block_ids] @ vectors.T).toarray()
+        indices[block_ids], scores[block_ids] = top_k_rows(block, k, row_ids=block_ids, overwrite=True)
 
-    print(f"Dataset shape after fetching details: {movies_df.shape}")
+def update_neighbors(vectors, previous, updated_rows, k):
+    """
+    Updates a top-K table after the rows in `updated_rows` were added or changed.
 
-    # --- Preprocessing and Feature Engineering (from here it's mostly the same) ---
-    movies = movies_df[['id', 'title', 'overview', 'genres', 'keywords.keywords', 'credits.cast', 'credits.crew']].copy()
+    `vectors` are the L2-normalized vectors of the whole catalog; `previous` is
+    the old NeighborIndex, which covers the first len(previous) rows. Updated
+    rows get their full neighbor list recomputed. Every other row keeps its old
+    neighbors, minus stale entries pointing at updated rows, merged with its
+    fresh scores against the updated rows.
 
-    def extract_names(data, key='name', limit=3):
-        if isinstance(data, list):
-            return [i[key] for i in data[:limit]]
-        return []
+    Movies missing from a row's old list scored at most its old K-th score. A
+    row whose merged K-th score falls below that may therefore be missing
+    neighbors that were never stored, so such rows are recomputed in full.
+    """
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    updated_rows = np.asarray(sorted(updated_rows), dtype=np.int32)
+    indices = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    _recompute_rows(vectors, updated_rows, k, indices, scores)
 
-    def get_director(crew_data):
-        if isinstance(crew_data, list):
-            for member in crew_data:
-                if member['job'] == 'Director':
-                    return [member['name']]
-        return []
+    is_updated = np.zeros(n, dtype=bool)
+    is_updated[updated_rows] = True
+    kept_rows = np.flatnonzero(~is_updated)
+    updated_vectors = vectors[updated_rows].T
+    incomplete = []
+    for start in range(0, len(kept_rows), BLOCK_SIZE):
+        rows = kept_rows[start:start + BLOCK_SIZE]
+        old_indices = np.asarray(previous.indices[rows])[:, :k]
+        old_scores = np.asarray(previous.scores[rows], dtype=np.float32)[:, :k].copy()
+        old_kth = old_scores[:, -1].copy()
+        old_scores[is_updated[old_indices]] = -np.inf
+        fresh_scores = (vectors[rows] @ updated_vectors).toarray().astype(np.float32)
 
-    movies['genres'] = movies['genres'].apply(extract_names)
-    movies['keywords.keywords'] = movies['keywords.keywords'].apply(extract_names)
-    movies['credits.cast'] = movies['credits.cast'].apply(extract_names)
-    movies['credits.crew'] = movies['credits.crew'].apply(get_director)
+        candidates = np.hstack([old_indices, np.broadcast_to(updated_rows, fresh_scores.shape)])
+        candidate_scores = np.hstack([old_scores, fresh_scores])
+        best = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(candidate_scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        indices[rows] = np.take_along_axis(np.take_along_axis(candidates, best, axis=1), order, axis=1)
+        scores[rows] = np.take_along_axis(best_scores, order, axis=1)
+        incomplete.append(rows[scores[rows, -1] < old_kth])
 
-    movies.rename(columns={'keywords.keywords': 'keywords', 'credits.cast': 'cast', 'credits.crew': 'director'}, inplace=True)
+    incomplete = np.concatenate(incomplete) if incomplete else np.empty(0, dtype=np.intp)
+    _recompute_rows(vectors, incomplete, k, indices, scores)
+    print(f"Recomputed {len(updated_rows)} updated and {len(incomplete)} incomplete neighbor lists.")
+    return NeighborIndex(indices, scores)
 
-    for feature in ['genres', 'keywords', 'cast', 'director']:
-      if feature in movies.columns:
-        movies[feature] = movies[feature].apply(lambda x: [i.replace(" ", "") for i in x] if isinstance(x, list) else [])
+def publish_model(ids, titles, neighbor_index, vocabulary, counts, mode, ann_index=None):
+    def write(directory, version):
+        if ann_index is not None:
+            ann_index.save(directory)
+        save_artifacts(directory, ids, titles, neighbor_index, extra={
+            'version': version,
+            'mode': mode,
+            'built_at': datetime.now(timezone.utc).isoformat(),
+            'ann': ann_index is not None,
+            'features': {field: len(vocabulary.terms[field]) for field in FIELDS},
+            'feature_weights': vocabulary.weights,
+        })
+        sparse.save_npz(os.path.join(directory, VECTORS_FILE), compact_counts(counts))
+        with open(os.path.join(directory, VOCABULARY_FILE), 'w') as f:
+            json.dump(vocabulary.to_json(), f)
 
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version = publish_version(MODEL_DIR, write)
+    print(f"✅ Model version {version} ({mode}, {len(ids)} movies) published to '{MODEL_DIR}'!")
 
-    movies['tags'] = movies['overview'].fillna('').apply(lambda x: x.split()) + \
-                     movies['genres'] + movies['keywords'] + movies['cast'] + movies['director']
+def build_ann(vectors):
+    with Timer() as ann_timer:
+        ann_index = LSHIndex.build(vectors, n_tables=ANN_TABLES, n_bits=ANN_BITS)
+    print(f"LSH index ({ANN_TABLES} tables x {ANN_BITS} bits) built in {ann_timer.elapsed:.1f}s")
+    return ann_index
 
-    movies['tags'] = movies['tags'].apply(lambda x: " ".join(x).lower())
+def full_build(use_ann=False):
+    # Step 1: Fetch initial list of popular movies
+    movies_df = fetch_movie_data(num_pages=NUM_PAGES)
+    if movies_df.empty:
+        print("Could not fetch movie data. Aborting.")
+        return False
 
-    final_df = movies[['id', 'title', 'tags']]
-    print("Sample of final data:")
-    print(final_df.head())
+    # Step 2: Fetch details for each movie
+    all_details = ingestor.fetch_details(movies_df['id'].tolist())
+    print(f"Ingestion: {ingestor.stats.summary()}")
+
+    if SAVE_CATALOG:
+        save_catalog(all_details)
+
+    details = select_details(movies_df, all_details)
+    print(f"Movies with details: {len(details)}")
 
     # --- Vectorization and Similarity Calculation ---
-    cv = CountVectorizer(max_features=5000, stop_words='english')
-    vectors = cv.fit_transform(final_df['tags']).toarray()
-    print(f"Vector shape: {vectors.shape}")
+    # Per-field feature counts, weighted and L2-normalized into sparse (CSR)
+    # vectors, so row dot products are cosines
+    with Timer() as vectorize_timer:
+        vocabulary, counts = FeatureVocabulary.fit(extract_fields(details), FEATURE_WEIGHTS)
+        vectors = vocabulary.vectors(counts)
+    describe_features(vocabulary, counts)
+    print(f"Vector shape: {vectors.shape} ({vectors.nnz} non-zeros) in {vectorize_timer.elapsed:.1f}s")
+
+    # Similarity is computed in row blocks keeping only the top-K of every row;
+    # the N x N matrix is never materialized. With an ANN index, the table is
+    # filled from LSH candidates instead, which avoids the O(N^2) products.
+    ann_index = build_ann(vectors) if use_ann else None
+    with Timer() as similarity_timer:
+        if ann_index is not None:
+            neighbor_index = NeighborIndex(*ann_index.neighbor_table(NEIGHBORS_K))
+        else:
+            neighbor_index = sparse_top_k(vectors, NEIGHBORS_K, budget_mb=SIMILARITY_BLOCK_MB, workers=SIMILARITY_WORKERS)
+    own_rss, children_rss = peak_rss_mb()
+    print(f"Neighbor table shape: {neighbor_index.indices.shape} in {similarity_timer.elapsed:.1f}s "
+          f"(peak RSS {own_rss:.0f} MB, workers {children_rss:.0f} MB)")
+
+    ids = np.asarray([movie['id'] for movie in details], dtype=np.int64)
+    publish_model(ids, [movie['title'] for movie in details], neighbor_index, vocabulary, counts, 'full', ann_index)
+    return True
+
+def incremental_build(previous):
+    """
+    Refreshes the published model with new and changed movies only.
+
+    The vocabulary, feature weights and K of the previous full build are
+    reused, so terms first seen in new movies are ignored until the next full
+    build.
+    """
+    artifacts = previous['artifacts']
+    ids = np.asarray(artifacts.ids, dtype=np.int64)
+    titles = [artifacts.titles[i] for i in range(len(artifacts))]
+    row_by_id = {movie_id: row for row, movie_id in enumerate(ids.tolist())}
+
+    movies_df = fetch_movie_data(num_pages=NUM_PAGES)
+    if movies_df.empty:
+        print("Could not fetch movie data. Aborting.")
+        return False
+    new_ids = [m for m in movies_df['id'].tolist() if m not in row_by_id]
+
+    built_at = artifacts.manifest.get('built_at')
+    since = (datetime.fromisoformat(built_at) if built_at else datetime.fromtimestamp(artifacts.manifest['created_at'], timezone.utc)).strftime('%Y-%m-%d')
+    changed_ids = [m for m in ingestor.fetch_changes(since) if m in row_by_id]
+    print(f"Incremental build: {len(new_ids)} new and {len(changed_ids)} changed movies since {since}.")
+    if not new_ids and not changed_ids:
+        print("Model is up to date.")
+        return True
+
+    all_details = ingestor.fetch_details(new_ids + changed_ids)
+    print(f"Ingestion: {ingestor.stats.summary()}")
+    if SAVE_CATALOG:
+        save_catalog(all_details)
+
+    # Changed movies may have left the popular list, so take their rows from the details
+    fetched_df = pd.concat([movies_df[movies_df['id'].isin(new_ids)], pd.DataFrame({'id': changed_ids})], ignore_index=True)
+    details = select_details(fetched_df, all_details)
+    vocabulary = previous['vocabulary']
+    if vocabulary.weights != FEATURE_WEIGHTS:
+        print(f"Keeping the feature weights of the last full build: {vocabulary.weights}")
+    fetched_counts = vocabulary.encode(extract_fields(details))
 
-    similarity = cosine_similarity(vectors)
-    print(f"Similarity matrix shape: {similarity.shape}")
+    # Changed movies keep their row; new movies are appended
+    counts = previous['counts'].tolil()
+    new_rows = []
+    appended = []
+    for i, movie in enumerate(details):
+        movie_id, title = movie['id'], movie['title']
+        row = row_by_id.get(movie_id)
+        if row is None:
+            row = len(ids) + len(appended)
+            appended.append(i)
+            titles.append(title)
+        else:
+            titles[row] = title
+            counts[row] = fetched_counts[i]
+        new_rows.append(row)
+    counts = sparse.vstack([counts.tocsr(), fetched_counts[appended]]).tocsr()
+    ids = np.concatenate([ids, np.asarray([details[i]['id'] for i in appended], dtype=np.int64)])
 
-    # --- Save Model Assets ---
-    backend_dir = os.path.join(os.path.dirname(__file__), '..', 'backend')
+    vectors = vocabulary.vectors(counts)
+    neighbor_index = update_neighbors(vectors, artifacts.neighbors, new_rows, artifacts.neighbors.k)
+    # Hashing is linear in N, so an ANN index is simply rebuilt
+    ann_index = build_ann(vectors) if artifacts.ann is not None else None
+    publish_model(ids, titles, neighbor_index, vocabulary, counts, 'incremental', ann_index)
+    return True
 
-    # Create the backend directory if it doesn't exist
-    os.makedirs(backend_dir, exist_ok=True)
+def main():
+    parser = argparse.ArgumentParser(description="Build the WatchWorthy recommendation model.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only fetch and vectorize new or changed movies and update the published model")
+    parser.add_argument('--ann', action='store_true',
+                        help="Build an LSH index for approximate recommendations (RECOMMENDER_BACKEND=ann)")
+    args = parser.parse_args()
 
-    # Define the full file paths
-    movies_df_path = os.path.join(backend_dir, 'movies_df.joblib')
-    similarity_path = os.path.join(backend_dir, 'similarity.joblib')
+    with Timer() as build_timer:
+        previous = load_previous_model(MODEL_DIR) if args.incremental else None
+        if args.incremental and previous is None:
+            print("No previous model with builder state found; running a full build.")
+        built = incremental_build(previous) if previous is not None else full_build(use_ann=args.ann)
+    own_rss, children_rss = peak_rss_mb()
+    print(f"Build finished in {build_timer.elapsed:.1f}s, peak RSS {own_rss:.0f} MB (workers {children_rss:.0f} MB).")
 
-    # Save the files to the specified paths
-    joblib.dump(final_df, movies_df_path)
-    joblib.dump(similarity, similarity_path)
+    if built:
+        # The run completed, so the next one starts from fresh TMDB data
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
 
-    print(f"✅ Model assets saved successfully to the '{backend_dir}' directory!")
-else:
-    print("Could not fetch movie data. Aborting.")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Sparse, chunked top-K cosine similarity for the model builder.
+
+The N x N similarity matrix is never materialized: rows are processed in
+blocks whose dense B x N score matrix fits a fixed memory budget, and only
+the top-K entries of every row are kept. Blocks can be spread across a
+process pool.
+"""
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+from neighbors import NeighborIndex, top_k_rows
+
+# Memory budget for one dense block of scores
+DEFAULT_BLOCK_MB = 256
+
+_vectors = None
+_k = None
+
+
+def block_rows(n, budget_mb=DEFAULT_BLOCK_MB):
+    """
+    Rows per block so that a float32 block of B x n scores fits the budget.
+    """
+    return max(1, min(n, int(budget_mb * 2 ** 20 // (4 * max(n, 1)))))
+
+
+def _init_worker(vectors, k):
+    global _vectors, _k
+    _vectors = vectors
+    _k = k
+
+
+def _top_k_block(start, stop, vectors=None, k=None):
+    vectors = _vectors if vectors is None else vectors
+    k = _k if k is None else k
+    scores = (vectors[start:stop] @ vectors.T).toarray()
+    indices, best = top_k_rows(scores, k, row_offset=start, overwrite=True)
+    return start, indices, best
+
+
+def sparse_top_k(vectors, k, budget_mb=DEFAULT_BLOCK_MB, workers=1):
+    """
+    Computes the top-K neighbor table of L2-normalized sparse row vectors.
+
+    `vectors` is an N x V CSR matrix whose rows have unit norm, so the dot
+    product of two rows is their cosine similarity.
+    """
+    vectors = vectors.tocsr()
+    n = vectors.shape[0]
+    k = min(k, max(n - 1, 0))
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    step = block_rows(n, budget_mb)
+    blocks = [(start, min(start + step, n)) for start in range(0, n, step)]
+
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectors, k)) as pool:
+            results = pool.map(_top_k_block, *zip(*blocks))
+            for start, block_indices, block_scores in results:
+                indices[start:start + len(block_indices)] = block_indices
+                scores[start:start + len(block_scores)] = block_scores
+    else:
+        for start, stop in blocks:
+            _, indices[start:stop], scores[start:stop] = _top_k_block(start, stop, vectors, k)
+    return NeighborIndex(indices, scores)
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and of its finished children, in MB.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux
+    return own / 1024, children / 1024
+
+
+class Timer:
+    """
+    Context manager that records the wall time of a build stage.
+    """
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
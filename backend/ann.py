@@ -0,0 +1,143 @@
+import json
+import os
+import numpy as np
+from scipy import sparse
+
+# Random-projection LSH index over the L2-normalized tag vectors.
+#
+# Each of `n_tables` tables hashes a vector to an `n_bits` code: bit j is the
+# sign of its dot product with a random hyperplane. Similar vectors (small
+# angle) agree on most bits, so they tend to share buckets. A query looks up
+# its own bucket and every bucket one bit away (multi-probe) in every table,
+# then reranks the union of candidates by exact cosine similarity.
+#
+# Stored in an `ann/` directory inside a model version, as mmap-able arrays:
+#   meta.json                         tables, bits, seed
+#   planes.npy                        float32 (tables * bits) x V hyperplanes
+#   codes.npy                         uint32 N x tables bucket codes
+#   order.npy / sorted_codes.npy      per table: rows sorted by code, and the sorted codes
+#   vectors.{data,indices,indptr}.npy the CSR vectors used for reranking
+ANN_DIR = "ann"
+
+
+class LSHIndex:
+    def __init__(self, vectors, planes, codes, order, sorted_codes, meta):
+        self.vectors = vectors
+        self.planes = planes
+        self.codes = codes
+        self.order = order
+        self.sorted_codes = sorted_codes
+        self.meta = meta
+        self.n_tables = meta["tables"]
+        self.n_bits = meta["bits"]
+        self._flips = (np.uint32(1) << np.arange(self.n_bits, dtype=np.uint32))
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @staticmethod
+    def hash(vectors, planes, n_tables, n_bits, block_size=65536):
+        """
+        Returns the uint32 bucket code of every row in every table.
+        """
+        weights = np.uint32(1) << np.arange(n_bits, dtype=np.uint32)
+        codes = np.empty((vectors.shape[0], n_tables), dtype=np.uint32)
+        for start in range(0, vectors.shape[0], block_size):
+            projected = np.asarray(vectors[start:start + block_size] @ planes.T)
+            bits = (projected > 0).reshape(-1, n_tables, n_bits)
+            codes[start:start + block_size] = (bits * weights).sum(axis=2, dtype=np.uint32)
+        return codes
+
+    @classmethod
+    def build(cls, vectors, n_tables=32, n_bits=10, seed=0):
+        if n_bits > 32:
+            raise ValueError("n_bits must be at most 32")
+        vectors = sparse.csr_matrix(vectors, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_tables * n_bits, vectors.shape[1]), dtype=np.float32)
+        codes = cls.hash(vectors, planes, n_tables, n_bits)
+        order = np.argsort(codes, axis=0, kind="stable").T.astype(np.int32)
+        sorted_codes = np.take_along_axis(codes.T, order, axis=1)
+        meta = {"tables": n_tables, "bits": n_bits, "seed": seed}
+        return cls(vectors, planes, codes, np.ascontiguousarray(order), np.ascontiguousarray(sorted_codes), meta)
+
+    def save(self, path):
+        path = os.path.join(path, ANN_DIR)
+        os.makedirs(path, exist_ok=True)
+        for name, array in (
+            ("planes", self.planes), ("codes", self.codes), ("order", self.order), ("sorted_codes", self.sorted_codes),
+            ("vectors.data", self.vectors.data), ("vectors.indices", self.vectors.indices), ("vectors.indptr", self.vectors.indptr),
+        ):
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({**self.meta, "dims": int(self.vectors.shape[1])}, f)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-maps the index stored in a model directory. Returns None if there is none.
+        """
+        path = os.path.join(path, ANN_DIR)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        indptr = array("vectors.indptr")
+        vectors = sparse.csr_matrix(
+            (array("vectors.data"), array("vectors.indices"), indptr),
+            shape=(len(indptr) - 1, meta["dims"]), copy=False,
+        )
+        return cls(vectors, array("planes"), array("codes"), array("order"), array("sorted_codes"), meta)
+
+    def candidates(self, row):
+        """
+        Rows sharing a bucket with `row`, or one bit away from it, in any table.
+        """
+        found = []
+        for table in range(self.n_tables):
+            code = self.codes[row, table]
+            probes = np.concatenate(([code], code ^ self._flips))
+            lo = np.searchsorted(self.sorted_codes[table], probes, side="left")
+            hi = np.searchsorted(self.sorted_codes[table], probes, side="right")
+            order = self.order[table]
+            found.extend(order[a:b] for a, b in zip(lo, hi) if b > a)
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    def query(self, row, n):
+        """
+        Returns (rows, scores) of the approximate n nearest neighbors of a row.
+        """
+        candidates = self.candidates(row)
+        candidates = candidates[candidates != row]
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+        scores = (self.vectors[candidates] @ self.vectors[row].T).toarray().ravel().astype(np.float32)
+        n = min(n, len(candidates))
+        best = np.argpartition(-scores, n - 1)[:n]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return candidates[best], scores[best]
+
+    def neighbor_table(self, k):
+        """
+        Approximate top-k neighbor table for every row, in the NeighborIndex layout.
+
+        Rows with fewer than k candidates are padded with zero-score entries.
+        """
+        n = len(self)
+        k = min(k, max(n - 1, 0))
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.zeros((n, k), dtype=np.float32)
+        for row in range(n):
+            rows, row_scores = self.query(row, k)
+            found = len(rows)
+            indices[row, :found] = rows
+            scores[row, :found] = row_scores
+            if found < k:
+                indices[row, found:] = (row + 1 + np.arange(k - found)) % n
+        return indices, scores
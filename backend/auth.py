@@ -1,28 +1,22 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import os
+import secrets
 from jose import JWTError, jwt
 import schemas
 import crud
-from database import SessionLocal
-from fastapi import Depends, HTTPException, status
+from cache import principal_cache
+from database import get_db
+from hashing import pwd_context
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# Setup for password hashing
-#
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+# Password hashing is configured in hashing.py; request handlers should use
+# hashing.password_hasher, which runs it outside the event loop.
 
 
 
@@ -32,6 +26,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "a_default_secret_key_for_dev")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Trust the user id ("uid" claim) of access tokens, so endpoints that only need
+# the caller's identity never query the users table. Tokens without the claim
+# fall back to the principal cache.
+TOKEN_USER_ID_CLAIM = os.getenv("TOKEN_USER_ID_CLAIM", "1") == "1"
+
+# Shared secret for the /admin endpoints, sent in the X-Admin-Token header.
+# The endpoints are disabled while it is unset.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -48,7 +51,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _decode_access_token(token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,11 +62,39 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = schemas.TokenData(username=username)
+        token_data = schemas.TokenData(username=username, user_id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
-    
-    user = crud.get_user_by_username(db, username=token_data.username)
+    return token_data, credentials_exception
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """
+    Identity of the caller (id and username) for endpoints that need nothing else.
+
+    Answered from the token's uid claim or the principal cache; the session
+    only opens a connection on a cache miss.
+    """
+    token_data, credentials_exception = _decode_access_token(token)
+    if TOKEN_USER_ID_CLAIM and token_data.user_id is not None:
+        return schemas.Principal(id=token_data.user_id, username=token_data.username)
+    cached = principal_cache.get(token_data.username)
+    if cached is not None:
+        return schemas.Principal(**cached)
+    principal = await crud.get_principal(db, username=token_data.username)
+    if principal is None:
+        raise credentials_exception
+    principal_cache.set(token_data.username, principal.model_dump())
+    return principal
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    token_data, credentials_exception = _decode_access_token(token)
+    user = await crud.get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import redis
+except ImportError:  # Optional dependency, only needed for a shared cache
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Interface of a key/value store used by the caches in this module.
+
+    Values must be JSON-serializable so a shared backend can store them.
+    `blocking` backends do I/O and must be called off the event loop.
+    """
+
+    blocking = True
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process LRU cache with a per-entry TTL. Safe to use from threads.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries=10000, default_ttl=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared cache for multi-worker deployments. Requires the `redis` package.
+
+    Calls time out after `timeout` seconds; a slow or unreachable Redis then
+    reads as a miss and writes are dropped, so requests are computed instead.
+    """
+
+    def __init__(self, url, prefix="watchworthy:", timeout=0.25):
+        if redis is None:
+            raise RuntimeError("The 'redis' package is required for a Redis cache backend")
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except redis.RedisError as e:
+            logger.warning("cache read failed", extra={"error": str(e)})
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+        except redis.RedisError as e:
+            logger.warning("cache write failed", extra={"error": str(e)})
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            logger.warning("cache delete failed", extra={"error": str(e)})
+
+
+class RecommendationCache:
+    """
+    Caches /recommendations/ results per user and watchlist version.
+
+    The version is users.watchlist_version, which every watchlist change
+    increments in the same transaction, so all workers agree on it even with
+    an in-process backend. Entries of older versions are simply never read
+    again and expire through the TTL/LRU.
+    """
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, user_id, watchlist_version, variant=""):
+        """
+        Cache key of a user's result at `watchlist_version`.
+
+        Read the version before computing and use the key for both get and
+        set, so a result computed while the watchlist changed is stored under
+        the old version and never served.
+        """
+        return f"recs:{user_id}:{watchlist_version}:{variant}"
+
+    async def get(self, key):
+        # A blocking backend runs in the threadpool, so a Redis round trip
+        # never holds up the event loop
+        if self.backend.blocking:
+            value = await run_in_threadpool(self.backend.get, key)
+        else:
+            value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value):
+        if self.backend.blocking:
+            await run_in_threadpool(self.backend.set, key, value, self.ttl)
+        else:
+            self.backend.set(key, value, ttl=self.ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def backend_from_env(max_entries_var, default_max_entries):
+    """
+    Returns the backend named by CACHE_URL (redis://...), or an in-memory one.
+    """
+    url = os.getenv("CACHE_URL")
+    if url:
+        return RedisBackend(url, timeout=float(os.getenv("CACHE_TIMEOUT", "0.25")))
+    return MemoryBackend(max_entries=int(os.getenv(max_entries_var, default_max_entries)))
+
+
+recommendation_cache = RecommendationCache(
+    backend_from_env("RECOMMENDATION_CACHE_SIZE", 10000),
+    ttl=int(os.getenv("RECOMMENDATION_CACHE_TTL", "300")),
+)
+
+# Authenticated principals ({"id", "username"}) by token subject. Always
+# in-process: a password change invalidates it in the worker that handled the
+# change, and other workers pick it up within the short TTL.
+principal_cache = MemoryBackend(
+    max_entries=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    default_ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
@@ -0,0 +1,26 @@
+"""
+Converts the legacy joblib model files into the mmap-able model directory.
+
+Usage (from the backend directory):
+    python convert_model.py [--movies movies_df.joblib] [--neighbors neighbors.joblib]
+                            [--similarity similarity.joblib] [--out model]
+"""
+import argparse
+import model_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert joblib model files to the mmap model format.")
+    parser.add_argument("--movies", default="movies_df.joblib")
+    parser.add_argument("--neighbors", default="neighbors.joblib")
+    parser.add_argument("--similarity", default="similarity.joblib", help="Dense matrix used when no neighbor table exists")
+    parser.add_argument("--out", default="model")
+    args = parser.parse_args()
+
+    artifacts = model_store.load_legacy_artifacts(args.movies, args.neighbors, legacy_similarity_path=args.similarity)
+    manifest = model_store.save_artifacts(args.out, artifacts.ids, artifacts.titles, artifacts.neighbors)
+    print(f"✅ Wrote {manifest['count']} movies (K={manifest['k']}) to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
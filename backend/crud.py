@@ -1,72 +1,442 @@
-from sqlalchemy.orm import Session
+import logging
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 import models
 import schemas
 from auth import get_password_hash
+from cache import principal_cache
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+logger = logging.getLogger(__name__)
 
-def get_user_by_email(db: Session, email: str): # Add this new function
+# The API uses AsyncSession (see database.get_db). The catalog writes at the
+# bottom stay synchronous for the model builder.
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+async def get_principal(db: AsyncSession, username: str):
+    """
+    Returns only the id and username of a user, without loading the ORM object.
+    """
+    row = (await db.execute(select(models.User.id, models.User.username).where(models.User.username == username))).first()
+    return schemas.Principal(id=row.id, username=row.username) if row else None
+
+async def get_user_with_watchlist(db: AsyncSession, user_id: int):
+    """
+    Loads a user and their watchlist in two queries instead of a lazy load per access.
+    """
+    return await db.scalar(select(models.User).options(selectinload(models.User.watchlist_items)).where(models.User.id == user_id))
+
+async def get_user_by_email(db: AsyncSession, email: str): # Add this new function
     """
     Queries the database for a user with a specific email.
     """
-    return db.query(models.User).filter(models.User.email == email).first()
+    return await db.scalar(select(models.User).where(models.User.email == email))
 
-def create_user(db: Session, user: schemas.UserCreate):
-    print("--- SIGNUP STEP 5: Hashing password ---")
-    hashed_password = get_password_hash(user.password)
-    
-    print("--- SIGNUP STEP 6: Creating and committing to DB ---")
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+
+    logger.debug("creating user", extra={"username": user.username})
     db_user = models.User(
         username=user.username,
         email=user.email,
         full_name=user.full_name,
-        hashed_password=hashed_password
+        hashed_password=hashed_password,
+        # A new user has an empty watchlist; setting it avoids a lazy load on serialization
+        watchlist_items=[],
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
 
-def get_watchlist_items(db: Session, user_id: int):
+async def get_watchlist_items(db: AsyncSession, user_id: int):
     """
     Queries the database for all watchlist items belonging to a specific user.
     """
-    return db.query(models.WatchlistItem).filter(models.WatchlistItem.owner_id == user_id).all()
+    return (await db.scalars(select(models.WatchlistItem).where(models.WatchlistItem.owner_id == user_id).order_by(models.WatchlistItem.id))).all()
 
-def add_watchlist_item(db: Session, item: schemas.WatchlistItemCreate, user_id: int):
+async def get_watchlist_page(db: AsyncSession, user_id: int, limit: int, after_id: int = None):
+    """
+    Returns up to `limit` watchlist items with an id greater than `after_id`,
+    and the cursor of the next page (None on the last page).
+
+    Keyset pagination over the (owner_id, id) index: every page costs the same,
+    however deep into the watchlist it is.
+    """
+    query = select(models.WatchlistItem).where(models.WatchlistItem.owner_id == user_id)
+    if after_id is not None:
+        query = query.where(models.WatchlistItem.id > after_id)
+    items = (await db.scalars(query.order_by(models.WatchlistItem.id).limit(limit + 1))).all()
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return items[:limit], next_cursor
+
+async def iter_watchlist_sources(db: AsyncSession, user_id: int, batch_size: int = 50, max_items: int = None):
+    """
+    Yields (movie_id, movie_title) of a user's watchlist, newest first.
+
+    Only those two columns are selected, `batch_size` rows at a time, so a
+    caller that stops early never loads the rest of the watchlist.
+    """
+    before_id = None
+    remaining = max_items
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        query = select(models.WatchlistItem.id, models.WatchlistItem.movie_id, models.WatchlistItem.movie_title).where(
+            models.WatchlistItem.owner_id == user_id
+        )
+        if before_id is not None:
+            query = query.where(models.WatchlistItem.id < before_id)
+        rows = (await db.execute(query.order_by(models.WatchlistItem.id.desc()).limit(size))).all()
+        for row in rows:
+            yield row.movie_id, row.movie_title
+        if len(rows) < size:
+            return
+        before_id = rows[-1].id
+        if remaining is not None:
+            remaining -= len(rows)
+
+def _bump_watchlist_version(user_id: int):
+    """
+    UPDATE marking a user's watchlist as changed; run it in the transaction of the change.
+
+    The new version also invalidates the user's cached recommendations in every worker.
+    """
+    return (
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(watchlist_version=models.User.watchlist_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def get_watchlist_version(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User.watchlist_version).where(models.User.id == user_id))
+
+async def add_watchlist_item(db: AsyncSession, item: schemas.WatchlistItemCreate, user_id: int):
     """
     Creates a new watchlist item in the database for a specific user.
+
+    Adding a movie that is already on the watchlist returns the existing item.
     """
-    db_item = models.WatchlistItem(**item.dict(), owner_id=user_id)
+    db_item = models.WatchlistItem(**item.model_dump(), owner_id=user_id)
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    try:
+        await db.flush()
+        await db.execute(_bump_watchlist_version(user_id))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return await db.scalar(select(models.WatchlistItem).where(
+            models.WatchlistItem.owner_id == user_id,
+            models.WatchlistItem.movie_id == item.movie_id,
+        ))
     return db_item
 
-def remove_watchlist_item(db: Session, item_id: int, user_id: int):
+def _insert_skipping_duplicates(db: AsyncSession):
+    """
+    INSERT into watchlist_items that silently skips rows violating the
+    (owner_id, movie_id) unique index, where the database supports it.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(models.WatchlistItem).on_conflict_do_nothing(index_elements=["owner_id", "movie_id"])
+    if dialect == "sqlite":
+        return sqlite.insert(models.WatchlistItem).on_conflict_do_nothing(index_elements=["owner_id", "movie_id"])
+    return insert(models.WatchlistItem)
+
+async def remove_watchlist_item(db: AsyncSession, item_id: int, user_id: int):
     """
     Removes a watchlist item from the database.
     Ensures that a user can only delete their own items.
     """
-    db_item = db.query(models.WatchlistItem).filter(
+    db_item = await db.scalar(select(models.WatchlistItem).where(
         models.WatchlistItem.id == item_id,
         models.WatchlistItem.owner_id == user_id
-    ).first()
+    ))
     
     if db_item:
-        db.delete(db_item)
-        db.commit()
+        await db.delete(db_item)
+        await db.execute(_bump_watchlist_version(user_id))
+        await db.commit()
         return db_item
     return None
 
-def update_user_password(db: Session, user: models.User, new_password: str):
+async def add_watchlist_items(db: AsyncSession, items: list[schemas.WatchlistItemCreate], user_id: int):
+    """
+    Adds many movies to a user's watchlist with one multi-row INSERT in one transaction.
+
+    Movies already on the watchlist, or repeated in `items`, are skipped; so
+    are movies a concurrent request adds first. Returns (movie_id, status,
+    item) per input item, in input order.
+    """
+    movie_ids = {item.movie_id for item in items}
+    existing = set(await db.scalars(select(models.WatchlistItem.movie_id).where(
+        models.WatchlistItem.owner_id == user_id,
+        models.WatchlistItem.movie_id.in_(movie_ids),
+    )))
+    new_rows = {}
+    for item in items:
+        if item.movie_id not in existing and item.movie_id not in new_rows:
+            new_rows[item.movie_id] = {**item.model_dump(), "owner_id": user_id}
+    created = {}
+    if new_rows:
+        for db_item in await db.scalars(_insert_skipping_duplicates(db).returning(models.WatchlistItem), list(new_rows.values())):
+            created[db_item.movie_id] = db_item
+        if created:
+            await db.execute(_bump_watchlist_version(user_id))
+        await db.commit()
+
+    results = []
+    for item in items:
+        db_item = created.pop(item.movie_id, None)
+        results.append((item.movie_id, "added" if db_item is not None else "duplicate", db_item))
+    return results
+
+async def remove_watchlist_items(db: AsyncSession, item_ids: list[int], user_id: int):
+    """
+    Removes many watchlist items with one DELETE in one transaction.
+
+    Items that do not exist or belong to another user are reported as
+    not_found, ids repeated in `item_ids` as duplicate. Returns (item_id,
+    status) per input id, in input order.
+    """
+    deleted = set()
+    if item_ids:
+        deleted = set(await db.scalars(
+            delete(models.WatchlistItem)
+            .where(models.WatchlistItem.owner_id == user_id, models.WatchlistItem.id.in_(set(item_ids)))
+            .returning(models.WatchlistItem.id)
+        ))
+        if deleted:
+            await db.execute(_bump_watchlist_version(user_id))
+        await db.commit()
+    results = []
+    seen = set()
+    for item_id in item_ids:
+        if item_id in seen:
+            status = "duplicate"
+        else:
+            status = "deleted" if item_id in deleted else "not_found"
+        seen.add(item_id)
+        results.append((item_id, status))
+    return results
+
+async def update_user_password(db: AsyncSession, user: models.User, new_password: str, hashed_password: str = None):
     """
     Updates a user's password with a new hashed password.
+
+    Pass `hashed_password` when the hash was already computed elsewhere.
     """
-    hashed_password = get_password_hash(new_password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(new_password)
     user.hashed_password = hashed_password
     db.add(user)
+    await db.commit()
+    principal_cache.delete(user.username)
+    return user
+
+# ==================================
+# Materialized recommendations
+# ==================================
+
+async def get_materialized_recommendations(db: AsyncSession, user_id: int, strategy: str, model_version: str):
+    """
+    Returns the precomputed /recommendations/ response of a user, or None when
+    there is none for this model version and the current watchlist.
+
+    One primary-key read joined to the user's row.
+    """
+    return await db.scalar(
+        select(models.UserRecommendation.payload)
+        .join(models.User, models.User.id == models.UserRecommendation.user_id)
+        .where(
+            models.UserRecommendation.user_id == user_id,
+            models.UserRecommendation.strategy == strategy,
+            models.UserRecommendation.model_version == model_version,
+            models.UserRecommendation.watchlist_version == models.User.watchlist_version,
+        )
+    )
+
+# The functions below are used by materialize_recommendations.py and are synchronous
+
+def get_users_to_materialize(db: Session, model_version: str, strategies: list[str], after_id: int = None, limit: int = 500, everyone: bool = False):
+    """
+    Returns (id, watchlist_version) of up to `limit` users with a non-empty
+    watchlist and an id greater than `after_id`, in id order.
+
+    Unless `everyone` is set, only users missing an up-to-date row for one of
+    the `strategies` are returned.
+    """
+    User, Recommendation = models.User, models.UserRecommendation
+    query = select(User.id, User.watchlist_version).where(
+        select(models.WatchlistItem.id).where(models.WatchlistItem.owner_id == User.id).exists()
+    )
+    if not everyone:
+        current = [
+            select(Recommendation.user_id).where(
+                Recommendation.user_id == User.id,
+                Recommendation.strategy == strategy,
+                Recommendation.model_version == model_version,
+                Recommendation.watchlist_version == User.watchlist_version,
+            ).exists()
+            for strategy in strategies
+        ]
+        query = query.where(or_(*[~exists for exists in current]))
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    return db.execute(query.order_by(User.id).limit(limit)).all()
+
+def get_recent_watchlist_sources(db: Session, user_ids: list[int], max_items: int):
+    """
+    Returns {user_id: [(movie_id, movie_title), ...]} with the newest
+    `max_items` watchlist movies of every user, newest first.
+    """
+    item = models.WatchlistItem
+    position = func.row_number().over(partition_by=item.owner_id, order_by=item.id.desc()).label("position")
+    ranked = select(item.owner_id, item.movie_id, item.movie_title, position).where(item.owner_id.in_(user_ids)).subquery()
+    sources = {user_id: [] for user_id in user_ids}
+    rows = db.execute(
+        select(ranked.c.owner_id, ranked.c.movie_id, ranked.c.movie_title)
+        .where(ranked.c.position <= max_items)
+        .order_by(ranked.c.owner_id, ranked.c.position)
+    )
+    for owner_id, movie_id, movie_title in rows:
+        sources[owner_id].append((movie_id, movie_title))
+    return sources
+
+def save_user_recommendations(db: Session, rows: list[dict]):
+    """
+    Inserts or replaces user_recommendations rows, keyed on (user_id, strategy).
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        statement = (postgresql if dialect == "postgresql" else sqlite).insert(models.UserRecommendation)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "strategy"],
+            set_={column: statement.excluded[column] for column in ("model_version", "watchlist_version", "payload", "computed_at")},
+        )
+        db.execute(statement, rows)
+    else:
+        for row in rows:
+            db.merge(models.UserRecommendation(**row))
+    db.commit()
+
+def delete_stale_recommendations(db: Session, model_version: str):
+    """
+    Deletes rows computed with another model version; they can never be served again.
+    """
+    deleted = db.execute(delete(models.UserRecommendation).where(models.UserRecommendation.model_version != model_version)).rowcount
+    db.commit()
+    return deleted
+
+# ==================================
+# Local movie catalog
+# ==================================
+
+# Appended sub-resources the builder fetches but /movies/{movie_id} never returned
+CATALOG_EXCLUDED_FIELDS = ("credits", "keywords")
+
+def movie_row_from_details(details: dict):
+    """
+    Converts a TMDB movie details payload into a `movies` table row.
+    """
+    release_date = details.get("release_date") or None
+    payload = {k: v for k, v in details.items() if k not in CATALOG_EXCLUDED_FIELDS}
+    return {
+        "id": int(details["id"]),
+        "title": details.get("title"),
+        "overview": details.get("overview"),
+        "release_date": release_date,
+        "release_year": int(release_date[:4]) if release_date and release_date[:4].isdigit() else None,
+        "poster_path": details.get("poster_path"),
+        "genre_ids": [g["id"] for g in details.get("genres", [])] if "genres" in details else details.get("genre_ids", []),
+        "popularity": details.get("popularity"),
+        "vote_average": details.get("vote_average"),
+        "details": payload,
+    }
+
+def upsert_movies(db: Session, movie_details: list[dict], batch_size: int = 1000):
+    """
+    Inserts or updates catalog rows from TMDB details payloads in batches.
+    """
+    rows = {}
+    for details in movie_details:
+        row = movie_row_from_details(details)
+        rows[row["id"]] = row
+    rows = list(rows.values())
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        ids = [row["id"] for row in batch]
+        existing = {movie_id for (movie_id,) in db.query(models.Movie.id).filter(models.Movie.id.in_(ids))}
+        new_rows = [row for row in batch if row["id"] not in existing]
+        changed_rows = [row for row in batch if row["id"] in existing]
+        if new_rows:
+            db.execute(insert(models.Movie), new_rows)
+        if changed_rows:
+            db.execute(update(models.Movie), changed_rows)
     db.commit()
-    db.refresh(user)
-    return user
\ No newline at end of file
+    return len(rows)
+
+async def get_movie(db: AsyncSession, movie_id: int):
+    return await db.get(models.Movie, movie_id)
+
+def movie_summary(movie: models.Movie):
+    """
+    A catalog movie in the shape of a TMDB search/list result.
+    """
+    return {
+        "id": movie.id,
+        "title": movie.title,
+        "overview": movie.overview,
+        "release_date": movie.release_date or "",
+        "genre_ids": movie.genre_ids or [],
+        "poster_path": movie.poster_path,
+        "popularity": movie.popularity,
+        "vote_average": movie.vote_average,
+    }
+
+# Columns of a search result; the large details payload is never read for the index
+CATALOG_SUMMARY_COLUMNS = (
+    models.Movie.id, models.Movie.title, models.Movie.overview, models.Movie.release_date,
+    models.Movie.genre_ids, models.Movie.poster_path, models.Movie.popularity, models.Movie.vote_average,
+)
+
+async def get_catalog_summaries(db: AsyncSession):
+    """
+    Returns every catalog movie as a search result, for building the search index.
+    """
+    result = await db.stream(select(*CATALOG_SUMMARY_COLUMNS).execution_options(yield_per=1000))
+    return [movie_summary(row) async for row in result]
+
+# ==================================
+# Streaming exports
+# ==================================
+
+# Rows fetched per round trip (and held in memory) while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+WATCHLIST_EXPORT_COLUMNS = (models.WatchlistItem.id, models.WatchlistItem.movie_id, models.WatchlistItem.movie_title)
+
+async def stream_watchlist(db: AsyncSession, user_id: int, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Yields a user's watchlist in id order as batches of row mappings, read
+    through a server-side cursor `batch_size` rows at a time.
+    """
+    query = select(*WATCHLIST_EXPORT_COLUMNS).where(models.WatchlistItem.owner_id == user_id).order_by(models.WatchlistItem.id)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.mappings().partitions():
+        yield rows
+
+async def stream_catalog(db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Yields the local catalog in id order as batches of search-result rows.
+    """
+    query = select(*CATALOG_SUMMARY_COLUMNS).order_by(models.Movie.id)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.mappings().partitions():
+        yield rows
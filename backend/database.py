@@ -1,8 +1,14 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from collections import deque
 import os
+import time
 from dotenv import load_dotenv
+import metrics
 
 # Load environment variables for local development
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
@@ -15,8 +21,9 @@ if DATABASE_URL:
     # We are in production (on Render)
     SQLALCHEMY_DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-    # Add sslmode=require if it's not already in the URL
-    if "?sslmode=" not in SQLALCHEMY_DATABASE_URL:
+    # Add sslmode=require if it's not already in the URL (Postgres only, so a
+    # local sqlite:/// URL can be used for load tests)
+    if SQLALCHEMY_DATABASE_URL.startswith("postgresql") and "?sslmode=" not in SQLALCHEMY_DATABASE_URL:
         SQLALCHEMY_DATABASE_URL += "?sslmode=require"
 else:
     # We are in local development
@@ -27,8 +34,102 @@ else:
     DB_PORT = "5432"
     SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# The API talks to the database through asyncpg (aiosqlite for local SQLite
+# files); asyncpg spells sslmode=require as ssl=require.
+if SQLALCHEMY_DATABASE_URL.startswith("postgresql://"):
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1).replace("sslmode=", "ssl=")
+elif SQLALCHEMY_DATABASE_URL.startswith("sqlite://"):
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+else:
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL
+
 # --- End of URL Logic ---
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# --- Connection Pool Settings ---
+# Connections per worker: DB_POOL_SIZE kept open plus up to DB_MAX_OVERFLOW
+# extra under load. Size these so (size + overflow) x workers stays below the
+# server's max_connections.
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    # Recycle connections before server or proxy idle timeouts close them
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+}
+
+
+class PoolMetrics:
+    """
+    How long requests wait to check a connection out of the pool.
+    """
+
+    def __init__(self, samples=1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms = deque(maxlen=samples)
+
+    def record(self, seconds):
+        self.checkouts += 1
+        self.wait_ms.append(seconds * 1000)
+        metrics.DB_CHECKOUT_SECONDS.observe(seconds)
+
+    def stats(self, pool):
+        samples = sorted(self.wait_ms)
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "checkout_wait_ms": {
+                "p50": samples[len(samples) // 2] if samples else 0.0,
+                "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0,
+                "max": samples[-1] if samples else 0.0,
+            },
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records checkout waits (including connecting) in pool_metrics.
+    """
+
+    # Log under sqlalchemy.pool like the stock pools, so it is quiet by default
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.TimedQueuePool"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.record(time.perf_counter() - started)
+        return connection
+
+
+# Sync engine for scripts (the model builder, migrations, create_all)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the API
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+metrics.instrument_engine(async_engine.sync_engine)
 Base = declarative_base()
+
+
+async def get_db():
+    """
+    One session per request, shared by every dependency that asks for it.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def pool_stats():
+    return pool_metrics.stats(async_engine.sync_engine.pool)
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from fastapi.responses import StreamingResponse
+
+# Streaming NDJSON/CSV exports.
+#
+# Rows come from the database in batches through a server-side cursor (see
+# the stream_* functions in crud.py) and every batch is encoded into one chunk
+# and written to the response before the next is fetched. Nothing holds the
+# whole result, so memory per request stays at about one batch, and the first
+# bytes go out as soon as the first batch is read.
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Matches the format query parameter of the export endpoints
+FORMAT_PATTERN = f"^({'|'.join(MEDIA_TYPES)})$"
+
+
+async def ndjson_chunks(batches):
+    async for rows in batches:
+        yield "".join(json.dumps(dict(row), separators=(",", ":")) + "\n" for row in rows).encode()
+
+
+def _csv_value(value):
+    # Lists (genre ids) go into a single cell
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return value
+
+
+async def csv_chunks(batches, fieldnames):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    async for rows in batches:
+        writer.writerows([_csv_value(row[name]) for name in fieldnames] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header, when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def streaming_export(batches, export_format, fieldnames, filename):
+    """
+    Streams batches of row mappings as an NDJSON or CSV download.
+    """
+    if export_format == "csv":
+        body = csv_chunks(batches, fieldnames)
+    else:
+        body = ndjson_chunks(batches)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,137 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+import metrics
+
+# Password hashing, off the event loop and off the shared threadpool.
+#
+# argon2 is deliberately slow (tens of milliseconds of CPU per hash). Running
+# it in request handlers lets a burst of logins occupy every threadpool thread
+# and the GIL, so cheap endpoints queue behind it. Hashes and verifications
+# are sent to a small dedicated process pool instead. At most `workers +
+# queue_limit` of them may be pending; beyond that callers get HasherBusy and
+# the API answers 503 with Retry-After, rather than letting latency grow
+# without bound.
+
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+
+# Number of hashing processes (0 hashes in the default threadpool, unbounded)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Hash requests allowed to wait for a free worker before new ones are rejected
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
+
+
+class HasherBusy(Exception):
+    """
+    Raised when the hashing queue is full.
+    """
+
+
+def _timed(fn, *args):
+    # Wall time of the operation itself; the queue wait is measured from `started`
+    started = time.time()
+    run_started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter() - run_started
+
+
+def _hash(password):
+    return _timed(pwd_context.hash, password)
+
+
+def _verify(password, hashed_password):
+    return _timed(pwd_context.verify, password, hashed_password)
+
+
+class PasswordHasher:
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_limit=PASSWORD_HASH_QUEUE_LIMIT, samples=1000):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_ms = deque(maxlen=samples)
+        self.wait_ms = deque(maxlen=samples)
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads (uvicorn, the
+                # model registry) can copy held locks into the child. Scripts
+                # that start the app in-process need an `if __name__ ==
+                # "__main__":` guard, as with any spawned pool.
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def start(self):
+        """
+        Starts the worker processes ahead of the first login.
+        """
+        if self.workers > 0:
+            pool = self._executor()
+            for future in [pool.submit(_hash, "warm-up") for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    async def _run(self, operation, fn, *args):
+        # in_flight is only touched from the event loop thread, so no lock is needed
+        if self.workers > 0 and self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HasherBusy()
+        self.in_flight += 1
+        metrics.PASSWORD_HASH_IN_FLIGHT.set(self.in_flight)
+        submitted = time.time()
+        try:
+            if self.workers > 0:
+                result, started, elapsed = await asyncio.wrap_future(self._executor().submit(fn, *args))
+            else:
+                result, started, elapsed = await run_in_threadpool(fn, *args)
+        finally:
+            self.in_flight -= 1
+            metrics.PASSWORD_HASH_IN_FLIGHT.set(self.in_flight)
+        waited = max(0.0, started - submitted)
+        self.completed += 1
+        self.hash_ms.append(elapsed * 1000)
+        self.wait_ms.append(waited * 1000)
+        metrics.PASSWORD_HASH_SECONDS.observe(elapsed, operation=operation)
+        metrics.PASSWORD_HASH_WAIT_SECONDS.observe(waited)
+        return result
+
+    async def hash(self, password):
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, password, hashed_password):
+        return await self._run("verify", _verify, password, hashed_password)
+
+    def stats(self):
+        def percentiles(samples):
+            samples = sorted(samples)
+            if not samples:
+                return {"p50": 0.0, "p99": 0.0}
+            return {"p50": samples[len(samples) // 2], "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))]}
+
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_ms": percentiles(self.hash_ms),
+            "queue_wait_ms": percentiles(self.wait_ms),
+        }
+
+
+password_hasher = PasswordHasher()
@@ -1,35 +1,146 @@
-from fastapi import FastAPI, HTTPException, Depends, Body, Query
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Body, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-import joblib
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+import metrics
 import models
 import schemas
 import crud
 import auth
-from database import engine, SessionLocal
-import requests
-import os
+import export
+import model_registry
+import tmdb
+from cache import recommendation_cache
+from hashing import HasherBusy, password_hasher
+from database import AsyncSessionLocal, async_engine, get_db, pool_stats
+from logging_config import configure_logging
+
+# Before the module-level log lines below (CORS origins)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+LOOKUP_SECONDS = metrics.RECOMMENDER_SECONDS.labels(stage="lookup")
+
+# Both serve the precomputed neighbor table; "ann" requires a model built with
+# --ann and queries its LSH index only for rows the table does not cover
+RECOMMENDER_BACKEND = os.getenv("RECOMMENDER_BACKEND", "exact")
+
+# Seconds between checks for a newly published model version (0 disables hot reload)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+
+# "lazy" accepts requests as soon as the app has started and loads the model
+# and the search index in the background (see /ready); "eager" loads both
+# before the first request is accepted
+STARTUP_MODE = os.getenv("STARTUP_MODE", "lazy")
+
+# Seconds between rebuilds of the search index from the catalog table (0
+# disables them). The index is also rebuilt as soon as a new model version is
+# served, since the builder writes the catalog before publishing the model.
+SEARCH_INDEX_REFRESH_INTERVAL = float(os.getenv("SEARCH_INDEX_REFRESH_INTERVAL", "300"))
+
+# In-memory search index over the local catalog, built by the warm-up and
+# replaced whole by every rebuild, and the model version it was built alongside
+catalog_index = None
+catalog_index_model = None
+
+# The background warm-up, and how long it took once finished
+warmup_task = None
+warmup_seconds = None
+
+# The background task that keeps the search index current
+refresh_task = None
 
-# This line creates the database tables if they don't exist
-models.Base.metadata.create_all(bind=engine)
+def _new_search_index(movies):
+    # search_index brings in numpy, so it is imported here, off the event loop
+    import search_index
+    return search_index.SearchIndex(movies)
 
-def get_db():
-    db = SessionLocal()
+async def build_catalog_index():
+    global catalog_index, catalog_index_model
+    loaded = registry.current()
+    async with AsyncSessionLocal() as db:
+        movies = await crud.get_catalog_summaries(db)
+    # Searches keep using the previous index until the new one is assigned
+    catalog_index = await run_in_threadpool(_new_search_index, movies) if movies else None
+    catalog_index_model = loaded.version if loaded is not None else None
+    logger.info("search index built", extra={"movies": len(movies), "model": catalog_index_model})
+
+async def refresh_catalog_index():
+    await asyncio.shield(warmup_task)
+    built = time.monotonic()
+    # Wake often enough to notice a hot-reloaded model soon after the registry does
+    wake = min(interval for interval in (MODEL_RELOAD_INTERVAL, SEARCH_INDEX_REFRESH_INTERVAL) if interval > 0)
+    while True:
+        await asyncio.sleep(wake)
+        loaded = registry.current()
+        model_changed = loaded is not None and loaded.version != catalog_index_model
+        due = SEARCH_INDEX_REFRESH_INTERVAL > 0 and time.monotonic() - built >= SEARCH_INDEX_REFRESH_INTERVAL
+        if not (model_changed or due):
+            continue
+        try:
+            await build_catalog_index()
+        except Exception:
+            logger.exception("search index rebuild failed")
+        built = time.monotonic()
+
+async def warm_up():
+    global warmup_seconds
+    started = time.perf_counter()
     try:
-        yield db
-    finally:
-        db.close()
+        # Opening the model imports numpy (and joblib/pandas for legacy models)
+        if not await run_in_threadpool(registry.reload):
+            logger.warning("model files not found", extra={"path": registry.path})
+        await build_catalog_index()
+        # Imports httpx and creates the TMDB client before the first movie request
+        try:
+            await run_in_threadpool(tmdb.get_client)
+        except tmdb.TMDBError:
+            pass
+    except Exception:
+        logger.exception("warm-up failed")
+    warmup_seconds = time.perf_counter() - started
+    logger.info("warm-up finished", extra={"seconds": round(warmup_seconds, 3), "ready": registry.current() is not None})
+
+def warming_up():
+    return warmup_task is not None and not warmup_task.done()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global warmup_task, refresh_task
+    # Creates the database tables if they don't exist
+    async with async_engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    await run_in_threadpool(password_hasher.start)
+    warmup_task = asyncio.create_task(warm_up())
+    if STARTUP_MODE == "eager":
+        await warmup_task
+    registry.start()
+    if MODEL_RELOAD_INTERVAL > 0 or SEARCH_INDEX_REFRESH_INTERVAL > 0:
+        refresh_task = asyncio.create_task(refresh_catalog_index())
+    yield
+    warmup_task.cancel()
+    if refresh_task is not None:
+        refresh_task.cancel()
+    registry.stop()
+    password_hasher.shutdown()
+    await tmdb.close_client()
+    await async_engine.dispose()
 
 # Initialize the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS Configuration ---
 # Read origins from environment variable for production flexibility
 origins_str = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000")
 origins = [origin.strip() for origin in origins_str.split(",")]
 
-print(f"✅ Allowing CORS for origins: {origins}") # Helpful for debugging
+logger.info("allowing CORS origins", extra={"origins": origins})
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,17 +150,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- Load Model Assets on Startup ---
-# Note: This block assumes files are present. For deployment, ensure they are
-# downloaded or included via Git LFS before this code runs.
-try:
-    movies = joblib.load('movies_df.joblib')
-    similarity = joblib.load('similarity.joblib')
-    print("✅ Model assets loaded successfully.")
-except FileNotFoundError:
-    print("⚠️ Error: Model files not found.")
-    movies = None
-    similarity = None
+# Outermost, so the request timings include every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+# --- Model Assets ---
+# The model directory is memory-mapped, so opening it is cheap and all workers
+# share the same page-cached arrays. It is opened by the warm-up after startup.
+# The registry polls the model root and swaps in newly published versions
+# without a restart. The legacy joblib files (including a dense
+# similarity.joblib) are still accepted when the directory is missing; run
+# convert_model.py to migrate them.
+registry = model_registry.default_registry(backend=RECOMMENDER_BACKEND, poll_interval=MODEL_RELOAD_INTERVAL)
 
 # --- API Endpoints ---
 
@@ -57,147 +168,270 @@ except FileNotFoundError:
 def read_root():
     return {"message": "Welcome to the WatchWorthy Recommendation API"}
 
-@app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user_by_username = crud.get_user_by_username(db, username=user.username)
+@app.get("/ready")
+def get_readiness(response: Response):
+    # Ready once recommendations can be served, for load balancer readiness checks
+    loaded = registry.current()
+    if loaded is None:
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+    return {
+        "ready": loaded is not None,
+        "warming_up": warming_up(),
+        "model": loaded.version if loaded is not None else None,
+        "search_index": catalog_index is not None,
+        "warmup_seconds": round(warmup_seconds, 3) if warmup_seconds is not None else None,
+    }
+
+def _hasher_busy():
+    return HTTPException(status_code=503, detail="Too many password operations in progress, please retry shortly", headers={"Retry-After": "1"})
+
+async def _check_new_user(db: AsyncSession, user: schemas.UserCreate):
+    db_user_by_username = await crud.get_user_by_username(db, username=user.username)
     if db_user_by_username:
         raise HTTPException(status_code=400, detail="Username already registered")
-    
-    db_user_by_email = crud.get_user_by_email(db, email=user.email)
+
+    db_user_by_email = await crud.get_user_by_email(db, email=user.email)
     if db_user_by_email:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    return crud.create_user(db=db, user=user)
+@app.post("/users/", response_model=schemas.User)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    await _check_new_user(db, user)
+    # Give the connection back to the pool while the password is hashed
+    await db.close()
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherBusy:
+        raise _hasher_busy()
+    return await crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @app.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await crud.get_user_by_username(db, username=form_data.username)
+    await db.close()
+    try:
+        valid = user is not None and await password_hasher.verify(form_data.password, user.hashed_password)
+    except HasherBusy:
+        raise _hasher_busy()
+    if not valid:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.username})
+    access_token = auth.create_access_token(data={"sub": user.username, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/users/me/", response_model=schemas.User)
-def read_users_me(current_user: schemas.User = Depends(auth.get_current_user)):
-    return current_user
+async def read_users_me(db: AsyncSession = Depends(get_db), principal: schemas.Principal = Depends(auth.get_current_principal)):
+    user = await crud.get_user_with_watchlist(db, principal.id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    return user
 
 # === WATCHLIST ENDPOINTS ===
 
 @app.post("/watchlist/", response_model=schemas.WatchlistItem)
-def add_movie_to_watchlist(item: schemas.WatchlistItemCreate, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.get_current_user)):
-    return crud.add_watchlist_item(db=db, item=item, user_id=current_user.id)
+async def add_movie_to_watchlist(item: schemas.WatchlistItemCreate, db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    return await crud.add_watchlist_item(db=db, item=item, user_id=current_user.id)
 
 @app.get("/watchlist/", response_model=list[schemas.WatchlistItem])
-def get_user_watchlist(db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.get_current_user)):
-    return crud.get_watchlist_items(db=db, user_id=current_user.id)
+async def get_user_watchlist(response: Response, limit: int = Query(None, ge=1, le=1000), cursor: int = Query(None), db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    # Without a limit the whole watchlist is returned, as before. With one, the
+    # X-Next-Cursor header carries the cursor of the next page when there is one.
+    if limit is None and cursor is None:
+        return await crud.get_watchlist_items(db=db, user_id=current_user.id)
+    items, next_cursor = await crud.get_watchlist_page(db=db, user_id=current_user.id, limit=limit or 100, after_id=cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return items
+
+@app.post("/watchlist/batch", response_model=list[schemas.WatchlistBatchAddResult])
+async def add_movies_to_watchlist(batch: schemas.WatchlistBatchCreate, db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    results = await crud.add_watchlist_items(db=db, items=batch.items, user_id=current_user.id)
+    return [{"movie_id": movie_id, "status": status, "item": item} for movie_id, status, item in results]
+
+@app.delete("/watchlist/batch", response_model=list[schemas.WatchlistBatchDeleteResult])
+async def delete_watchlist_items(batch: schemas.WatchlistBatchDelete, db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    results = await crud.remove_watchlist_items(db=db, item_ids=batch.item_ids, user_id=current_user.id)
+    return [{"item_id": item_id, "status": status} for item_id, status in results]
+
+@app.get("/watchlist/export")
+async def export_watchlist(format: str = Query("ndjson", pattern=export.FORMAT_PATTERN), db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    # The session stays open until the response has been sent
+    batches = crud.stream_watchlist(db, current_user.id)
+    return export.streaming_export(batches, format, [column.key for column in crud.WATCHLIST_EXPORT_COLUMNS], "watchlist")
 
 @app.delete("/watchlist/{item_id}", response_model=schemas.WatchlistItem)
-def delete_watchlist_item(item_id: int, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.get_current_user)):
-    db_item = crud.remove_watchlist_item(db=db, item_id=item_id, user_id=current_user.id)
+async def delete_watchlist_item(item_id: int, db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    db_item = await crud.remove_watchlist_item(db=db, item_id=item_id, user_id=current_user.id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Watchlist item not found or you do not have permission to delete it")
     return db_item
 
 # === MOVIE DATA & RECOMMENDATION ENDPOINTS ===
 
-@app.get("/recommendations/")
-def get_user_recommendations(db: Session = Depends(auth.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    user_watchlist = db.query(models.WatchlistItem).filter(models.WatchlistItem.owner_id == current_user.id).order_by(models.WatchlistItem.id.desc()).all()
-    if not user_watchlist:
-        raise HTTPException(status_code=404, detail="Watchlist is empty.")
-    if movies is None or similarity is None:
+def serving_model():
+    # One model reference per request, so a reload cannot switch versions midway.
+    # Declared before the other dependencies, so requests during warm-up are
+    # answered without touching the token or the database.
+    loaded = registry.current()
+    if loaded is None:
+        if warming_up():
+            raise HTTPException(status_code=503, detail="Recommendations are warming up, please retry shortly", headers={"Retry-After": "1"})
         raise HTTPException(status_code=503, detail="Model is not available.")
-    for item in user_watchlist:
-        matching_movies = movies[movies['title'] == item.movie_title]
-        if not matching_movies.empty:
-            movie_index = matching_movies.index[0]
-            source_movie_title = item.movie_title
-            distances = similarity[movie_index]
-            movies_list = sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])[1:6]
-            recommended_movies = []
-            for i in movies_list:
-                rec_id = movies.iloc[i[0]].id
-                rec_title = movies.iloc[i[0]].title
-                recommended_movies.append({"id": int(rec_id), "title": rec_title})
-            return {"source_movie": source_movie_title, "recommendations": recommended_movies}
+    return loaded
+
+@app.get("/recommendations/")
+async def get_user_recommendations(loaded: model_registry.LoadedModel = Depends(serving_model), strategy: str = Query("latest", pattern="^(latest|blend)$"), db: AsyncSession = Depends(get_db), current_user: schemas.Principal = Depends(auth.get_current_principal)):
+    # A primary-key read, so every worker sees a watchlist change at once
+    watchlist_version = await crud.get_watchlist_version(db, current_user.id)
+    cache_key = recommendation_cache.key_for(current_user.id, watchlist_version, f"{strategy}:{loaded.version}")
+    cached = await recommendation_cache.get(cache_key)
+    metrics.RECOMMENDATION_CACHE_LOOKUPS.inc(result="hit" if cached is not None else "miss")
+    if cached is not None:
+        metrics.RECOMMENDATIONS_SERVED.inc(source="cache")
+        return cached
+    # Rows written by materialize_recommendations.py, while the watchlist is
+    # unchanged; on-line computation is the fallback
+    result = await crud.get_materialized_recommendations(db, current_user.id, strategy, loaded.version)
+    if result is not None:
+        metrics.RECOMMENDATIONS_SERVED.inc(source="materialized")
+    else:
+        result = await _compute_recommendations(db, loaded.engine, current_user.id, strategy)
+        metrics.RECOMMENDATIONS_SERVED.inc(source="online")
+    await recommendation_cache.set(cache_key, result)
+    return result
+
+async def _compute_recommendations(db: AsyncSession, rec_engine, user_id: int, strategy: str):
+    # Already imported by the model load
+    import recommender
+    if strategy == "blend":
+        # Neighbors of every matched watchlist movie, newest weighted highest
+        sources = [source async for source in crud.iter_watchlist_sources(db, user_id, batch_size=recommender.BLEND_MAX_ITEMS, max_items=recommender.BLEND_MAX_ITEMS)]
+        if not sources:
+            raise HTTPException(status_code=404, detail="Watchlist is empty.")
+        with LOOKUP_SECONDS.time():
+            matched = [(rec_engine.lookup(movie_id, title), title) for movie_id, title in sources]
+        matched = [(row, title) for row, title in matched if row is not None]
+        if matched:
+            rows = [row for row, _ in matched]
+            return recommender.blend_result([title for _, title in matched], rec_engine.blend(rows, 5, decay=recommender.BLEND_DECAY))
+    else:
+        # The newest matching movie is usually among the first few rows
+        empty = True
+        async for movie_id, title in crud.iter_watchlist_sources(db, user_id):
+            empty = False
+            with LOOKUP_SECONDS.time():
+                movie_index = rec_engine.lookup(movie_id, title)
+            if movie_index is not None:
+                return recommender.latest_result(title, rec_engine.similar(movie_index, 5))
+        if empty:
+            raise HTTPException(status_code=404, detail="Watchlist is empty.")
     raise HTTPException(status_code=404, detail="Could not find any of your watchlist movies in our recommendation dataset.")
 
-@app.get("/movies/search")
-def search_movies(query: str, start_year: int = Query(None), end_year: int = Query(None), genre_id: int = Query(None)):
-    tmdb_api_key = os.getenv("API_KEY")
-    if not tmdb_api_key:
+@app.get("/admin/stats", dependencies=[Depends(auth.require_admin)])
+def get_stats():
+    return {"recommendation_cache": recommendation_cache.stats(), "tmdb": tmdb.stats(), "model": registry.status(), "password_hashing": password_hasher.stats(), "database": pool_stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    metrics.DB_POOL_CHECKED_OUT.set(async_engine.sync_engine.pool.checkedout())
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admin/model", dependencies=[Depends(auth.require_admin)])
+def get_model_status():
+    return registry.status()
+
+@app.post("/admin/model/reload", dependencies=[Depends(auth.require_admin)])
+async def reload_model():
+    # Loading can take a while for legacy models, so keep it off the event loop
+    reloaded = await run_in_threadpool(registry.reload)
+    if reloaded:
+        await build_catalog_index()
+    return {"reloaded": reloaded, **registry.status()}
+
+def _tmdb_client():
+    try:
+        return tmdb.get_client()
+    except tmdb.TMDBError:
         raise HTTPException(status_code=500, detail="TMDB API key not configured")
-    params = {"api_key": tmdb_api_key, "language": "en-US", "query": query, "page": 1, "include_adult": False}
+
+@app.get("/movies/search")
+async def search_movies(query: str, start_year: int = Query(None), end_year: int = Query(None), genre_id: int = Query(None), page: int = Query(1, ge=1)):
+    # Serve from the local catalog index first; TMDB is only asked on a miss
+    if catalog_index is not None:
+        local = catalog_index.search(query, start_year, end_year, genre_id, page=page)
+        if local["total_results"]:
+            return local
+    client = _tmdb_client()
     try:
-        response = requests.get("https://api.themoviedb.org/3/search/movie", params=params)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results", [])
-        if genre_id:
-            results = [movie for movie in results if genre_id in movie.get("genre_ids", [])]
-        if start_year:
-            results = [movie for movie in results if movie.get("release_date") and int(movie["release_date"][:4]) >= start_year]
-        if end_year:
-            results = [movie for movie in results if movie.get("release_date") and int(movie["release_date"][:4]) <= end_year]
-        data["results"] = results
-        return data
-    except requests.exceptions.RequestException as e:
+        data = await client.search_movies(query, page=page)
+    except tmdb.TMDBError as e:
         raise HTTPException(status_code=502, detail=f"Error fetching from TMDB: {e}")
+    # The response is shared through the client cache, so filter into a copy
+    results = data.get("results", [])
+    if genre_id:
+        results = [movie for movie in results if genre_id in movie.get("genre_ids", [])]
+    if start_year:
+        results = [movie for movie in results if movie.get("release_date") and int(movie["release_date"][:4]) >= start_year]
+    if end_year:
+        results = [movie for movie in results if movie.get("release_date") and int(movie["release_date"][:4]) <= end_year]
+    return {**data, "results": results}
 
 @app.get("/movies/popular")
-def get_popular_movies():
-    tmdb_api_key = os.getenv("API_KEY")
-    if not tmdb_api_key:
-        raise HTTPException(status_code=500, detail="TMDB API key not configured")
-    url = f"https://api.themoviedb.org/3/movie/popular?api_key={tmdb_api_key}&language=en-US&page=1"
+async def get_popular_movies():
+    client = _tmdb_client()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return await client.popular_movies()
+    except tmdb.TMDBError as e:
         raise HTTPException(status_code=502, detail=f"Error fetching from TMDB: {e}")
 
+@app.get("/movies/export")
+async def export_catalog(format: str = Query("ndjson", pattern=export.FORMAT_PATTERN), db: AsyncSession = Depends(get_db)):
+    batches = crud.stream_catalog(db)
+    return export.streaming_export(batches, format, [column.key for column in crud.CATALOG_SUMMARY_COLUMNS], "movies")
+
 @app.get("/movies/{movie_id}")
-def get_movie_details(movie_id: int):
-    tmdb_api_key = os.getenv("API_KEY")
-    if not tmdb_api_key:
-        raise HTTPException(status_code=500, detail="TMDB API key not configured")
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={tmdb_api_key}&language=en-US"
+async def get_movie_details(movie_id: int, db: AsyncSession = Depends(get_db)):
+    movie = await crud.get_movie(db, movie_id)
+    if movie is not None and movie.details:
+        return movie.details
+    client = _tmdb_client()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return await client.movie_details(movie_id)
+    except tmdb.TMDBError as e:
         raise HTTPException(status_code=502, detail=f"Error fetching from TMDB: {e}")
 
 # === PASSWORD RECOVERY ENDPOINTS ===
 
 @app.post("/password-recovery/{email}")
-def recover_password(email: str, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=email)
+async def recover_password(email: str, db: AsyncSession = Depends(get_db)):
+    user = await crud.get_user_by_email(db, email=email)
     if not user:
         return {"msg": "If an account with this email exists, a password reset link has been sent."}
     
     password_reset_token = auth.create_password_reset_token(email=email)
     reset_link = f"http://localhost:5173/reset-password?token={password_reset_token}"
-    print("--- PASSWORD RESET LINK ---")
-    print(reset_link)
-    print("--------------------------")
+    # No mail is sent yet; the link is only logged
+    logger.info("password reset link", extra={"email": email, "reset_link": reset_link})
     return {"msg": "If an account with this email exists, a password reset link has been sent."}
 
 @app.post("/reset-password/")
-def reset_password(token: str = Body(...), new_password: str = Body(...), db: Session = Depends(get_db)):
+async def reset_password(token: str = Body(...), new_password: str = Body(...), db: AsyncSession = Depends(get_db)):
     email = auth.verify_password_reset_token(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
     
-    user = crud.get_user_by_email(db, email=email)
+    user = await crud.get_user_by_email(db, email=email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-        
-    crud.update_user_password(db, user, new_password)
+    await db.close()
+
+    try:
+        hashed_password = await password_hasher.hash(new_password)
+    except HasherBusy:
+        raise _hasher_busy()
+    await crud.update_user_password(db, user, new_password, hashed_password)
     return {"msg": "Password updated successfully."}
\ No newline at end of file
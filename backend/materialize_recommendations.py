@@ -0,0 +1,170 @@
+"""
+Precomputes the /recommendations/ response of every active user.
+
+Users with a non-empty watchlist are read in batches. Their newest watchlist
+movies are matched against the served model, and both strategies are
+computed per batch:
+- "latest" with one vectorized gather from the neighbor table for the whole batch;
+- "blend" with one call per user.
+
+Batches are spread over a process pool whose workers open the same model
+version memory-mapped. The results are upserted into user_recommendations
+together with the model version and each user's watchlist_version, so the
+API serves a row only while both still match. By default only users without
+an up-to-date row are recomputed; --all recomputes everyone. Rows of other
+model versions are deleted at the end.
+
+Run it after publishing a model and then periodically (e.g. from cron);
+users who change their watchlist in between get on-line recommendations
+until the next run.
+
+Usage (from the backend directory, with the usual DATABASE_URL / DB_* settings
+and the API's model directory):
+    python materialize_recommendations.py [--all] [--workers N] [--batch-size 500] [--strategies latest blend]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import models
+import crud
+import model_registry
+import recommender
+from database import SessionLocal, engine
+
+STRATEGIES = ("latest", "blend")
+# Recommendations per user, as served by /recommendations/
+TOP_N = 5
+
+_engine = None
+
+
+def compute_batch(rec_engine, batch, strategies, n=TOP_N, decay=recommender.BLEND_DECAY):
+    """
+    Computes the responses of a batch of users.
+
+    `batch` holds (user_id, watchlist_version, sources) with sources newest
+    first. Returns (user_id, strategy, watchlist_version, payload) tuples;
+    payload is None when no watchlist movie is in the model.
+    """
+    results = []
+    matched = []
+    found = iter(rec_engine.lookup_many([source for _, _, sources in batch for source in sources]))
+    for user_id, watchlist_version, sources in batch:
+        rows = []
+        for (_, title), row in zip(sources, found):
+            if row is not None:
+                rows.append((row, title))
+        matched.append((user_id, watchlist_version, rows))
+
+    if "latest" in strategies:
+        with_source = [(user_id, version, rows[0]) for user_id, version, rows in matched if rows]
+        similar = rec_engine.similar_batch([row for _, _, (row, _) in with_source], n)
+        for (user_id, version, (_, title)), movies in zip(with_source, similar):
+            results.append((user_id, "latest", version, recommender.latest_result(title, movies)))
+        results.extend((user_id, "latest", version, None) for user_id, version, rows in matched if not rows)
+
+    if "blend" in strategies:
+        for user_id, version, rows in matched:
+            payload = None
+            if rows:
+                movies = rec_engine.blend([row for row, _ in rows], n, decay=decay)
+                payload = recommender.blend_result([title for _, title in rows], movies)
+            results.append((user_id, "blend", version, payload))
+    return results
+
+
+def _init_worker(backend, version):
+    global _engine
+    _engine = model_registry.default_registry(backend=backend).load(version).engine
+
+
+def _compute_in_worker(batch, strategies):
+    return compute_batch(_engine, batch, strategies)
+
+
+def _read_batches(model_version, strategies, batch_size, everyone):
+    """
+    Yields batches of (user_id, watchlist_version, sources), reading users by id
+    in short transactions so the writes in between never wait on a reader.
+    """
+    after_id = None
+    while True:
+        with SessionLocal() as db:
+            users = crud.get_users_to_materialize(db, model_version, strategies, after_id=after_id, limit=batch_size, everyone=everyone)
+            if not users:
+                return
+            sources = crud.get_recent_watchlist_sources(db, [user_id for user_id, _ in users], recommender.BLEND_MAX_ITEMS)
+        yield [(user_id, version, sources[user_id]) for user_id, version in users]
+        after_id = users[-1][0]
+
+
+def _save(results, model_version):
+    computed_at = datetime.now(timezone.utc)
+    rows = [
+        {"user_id": user_id, "strategy": strategy, "model_version": model_version, "watchlist_version": version, "payload": payload, "computed_at": computed_at}
+        for user_id, strategy, version, payload in results
+    ]
+    with SessionLocal() as db:
+        crud.save_user_recommendations(db, rows)
+    return len(rows)
+
+
+def materialize(backend="exact", workers=1, batch_size=500, strategies=STRATEGIES, everyone=False):
+    """
+    Runs the job against the model the API would serve. Returns a summary dict.
+    """
+    registry = model_registry.default_registry(backend=backend)
+    if not registry.reload():
+        raise RuntimeError(f"No model found in '{os.path.abspath(registry.path)}'")
+    loaded = registry.current()
+    models.Base.metadata.create_all(bind=engine, tables=[models.UserRecommendation.__table__])
+
+    started = time.perf_counter()
+    users = 0
+    written = 0
+    batches = _read_batches(loaded.version, strategies, batch_size, everyone)
+    if workers > 1:
+        # spawn, as for the password hashing pool; workers map the same files
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(backend, loaded.version)) as pool:
+            # At most two batches per worker in flight, so memory stays bounded
+            pending = deque()
+            for batch in batches:
+                users += len(batch)
+                pending.append(pool.submit(_compute_in_worker, batch, strategies))
+                if len(pending) >= 2 * workers:
+                    written += _save(pending.popleft().result(), loaded.version)
+            while pending:
+                written += _save(pending.popleft().result(), loaded.version)
+    else:
+        for batch in batches:
+            users += len(batch)
+            written += _save(compute_batch(loaded.engine, batch, strategies), loaded.version)
+
+    with SessionLocal() as db:
+        deleted = crud.delete_stale_recommendations(db, loaded.version)
+    elapsed = time.perf_counter() - started
+    return {"model_version": loaded.version, "users": users, "rows": written, "deleted": deleted, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every active user.")
+    parser.add_argument("--all", action="store_true", help="Recompute users whose rows are still current too")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MATERIALIZE_WORKERS", str(os.cpu_count() or 1))))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--backend", default=os.getenv("RECOMMENDER_BACKEND", "exact"))
+    args = parser.parse_args()
+
+    summary = materialize(args.backend, args.workers, args.batch_size, args.strategies, everyone=args.all)
+    rate = summary["users"] / summary["seconds"] if summary["seconds"] else 0.0
+    print(f"✅ Materialized {summary['rows']} recommendations for {summary['users']} users with model {summary['model_version']} "
+          f"in {summary['seconds']:.1f}s ({rate:.0f} users/s); removed {summary['deleted']} rows of older models.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+
+# In-process metrics exposed in the Prometheus text format at /metrics.
+#
+# Deliberately small: counters, gauges and fixed-bucket histograms behind one
+# lock each. Recording a sample is a dict lookup and a bisect over ~15 bucket
+# bounds (about a microsecond), cheap enough to leave on in production. Hot
+# paths bind their labels once with Histogram.labels().
+# Each worker process keeps its own numbers; Prometheus adds them up per
+# instance label.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Requests slower than this are logged with their route and status (0 disables it)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+# Seconds; from sub-millisecond lookups up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registered.append(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram of durations in seconds.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key, value):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def labels(self, **labels):
+        """
+        Returns the series for fixed label values, for use on hot paths.
+        """
+        return _HistogramSeries(self, self._key(labels))
+
+    def time(self, **labels):
+        """
+        Observes the duration of a `with` block, also when it raises.
+        """
+        return _Timer(self, self._key(labels))
+
+    def _samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _HistogramSeries:
+    __slots__ = ("histogram", "key")
+
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def observe(self, value):
+        self.histogram._observe(self.key, value)
+
+    def time(self):
+        return _Timer(self.histogram, self.key)
+
+
+class _Timer:
+    __slots__ = ("histogram", "key", "started")
+
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+_registered = []
+
+
+def render():
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    return "\n".join(metric.render() for metric in _registered) + "\n"
+
+
+# --- Metrics recorded by the API ---
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to serve an HTTP request, by route template.", ("method", "route", "status"))
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served.")
+TMDB_SECONDS = Histogram("tmdb_request_duration_seconds", "Time of upstream TMDB requests.", ("path", "outcome"))
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time to execute a database statement.", ("operation",))
+DB_CHECKOUT_SECONDS = Histogram("db_pool_checkout_wait_seconds", "Time waited for a connection from the pool.")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool.")
+PASSWORD_HASH_SECONDS = Histogram("password_hash_duration_seconds", "Wall-clock time of an argon2 hash or verification, excluding the queue wait.", ("operation",),
+                                  buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+PASSWORD_HASH_WAIT_SECONDS = Histogram("password_hash_queue_wait_seconds", "Time a password operation waited for a hashing worker.")
+PASSWORD_HASH_IN_FLIGHT = Gauge("password_hash_in_flight", "Password operations running or queued.")
+RECOMMENDER_SECONDS = Histogram("recommender_stage_duration_seconds", "Time of the recommendation hot sections.", ("stage",),
+                                buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+RECOMMENDATION_CACHE_LOOKUPS = Counter("recommendation_cache_lookups", "Recommendation cache lookups.", ("result",))
+RECOMMENDATIONS_SERVED = Counter("recommendations_served", "Recommendation responses by where they came from.", ("source",))
+
+
+# --- Request timing middleware ---
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request until its last body chunk is sent.
+
+    Requests are labelled with the route template (/watchlist/{item_id}), not
+    the raw path, so ids do not create a series each. Unmatched paths share the
+    "unmatched" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route, status=status)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning("slow request", extra={"method": scope["method"], "route": route, "status": status, "duration_ms": round(elapsed * 1000, 1)})
+
+
+# --- Database statement timing ---
+
+_OPERATION = re.compile(r"\s*(\w+)")
+
+
+def instrument_engine(sync_engine):
+    """
+    Times every statement executed on an engine (the sync_engine of an async one).
+    """
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        match = _OPERATION.match(statement)
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, operation=match.group(1).upper() if match else "OTHER")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
@@ -0,0 +1,34 @@
+"""
+Adds users.watchlist_version and the user_recommendations table to an existing database.
+
+New databases get both from create_all. Safe to run more than once.
+
+Usage (from the backend directory, with the usual DATABASE_URL / DB_* settings):
+    python migrate_user_recommendations.py [--dry-run]
+"""
+import argparse
+from sqlalchemy import inspect, text
+import models
+from database import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add the tables and columns used by materialized recommendations.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        add_column = "watchlist_version" not in {column["name"] for column in inspector.get_columns("users")}
+        add_table = not inspector.has_table(models.UserRecommendation.__tablename__)
+        if args.dry_run:
+            print(f"Would add users.watchlist_version: {add_column}; would create user_recommendations: {add_table}")
+            return
+        if add_column:
+            conn.execute(text("ALTER TABLE users ADD COLUMN watchlist_version INTEGER NOT NULL DEFAULT 0"))
+        models.UserRecommendation.__table__.create(conn, checkfirst=True)
+    print("✅ users.watchlist_version and user_recommendations in place")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Adds the watchlist_items indexes declared in models.py to an existing database.
+
+New databases get them from create_all. Existing ones may already contain the
+same movie more than once per user, which the unique (owner_id, movie_id)
+index rejects, so duplicates are removed first, keeping the oldest row.
+Safe to run more than once.
+
+Usage (from the backend directory, with the usual DATABASE_URL / DB_* settings):
+    python migrate_watchlist_indexes.py [--dry-run]
+"""
+import argparse
+from sqlalchemy import func, select, delete
+import models
+from database import engine
+
+
+def duplicate_ids(conn):
+    keep = select(func.min(models.WatchlistItem.id)).group_by(models.WatchlistItem.owner_id, models.WatchlistItem.movie_id)
+    return conn.scalars(select(models.WatchlistItem.id).where(models.WatchlistItem.id.not_in(keep))).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the watchlist_items indexes on an existing database.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    indexes = models.WatchlistItem.__table__.indexes
+    with engine.begin() as conn:
+        duplicates = duplicate_ids(conn)
+        print(f"Found {len(duplicates)} duplicate watchlist rows.")
+        if args.dry_run:
+            for index in indexes:
+                print(f"Would create {index.name} ({', '.join(c.name for c in index.columns)}) if missing.")
+            return
+        if duplicates:
+            conn.execute(delete(models.WatchlistItem).where(models.WatchlistItem.id.in_(duplicates)))
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+    print(f"✅ Watchlist indexes in place: {', '.join(sorted(index.name for index in indexes))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Keeps the active recommendation model and swaps in new versions at runtime.
+#
+# A builder publishes a new version by replacing the CURRENT file of the model
+# root (see model_store.publish_version). The registry polls for that in a
+# background thread, opens the new version off the request path and then
+# replaces its reference to the loaded model in a single assignment. Requests
+# take one reference with current() and use it until they finish, so in-flight
+# requests complete on the version they started with.
+#
+# model_store and recommender (numpy, and joblib/pandas for legacy models) are
+# imported by the first probe, so importing the registry stays cheap and the
+# API can load the model after it has started.
+
+
+class LoadedModel:
+    """
+    One immutable, ready-to-serve model version.
+    """
+
+    def __init__(self, version, artifacts, engine, load_seconds):
+        self.version = version
+        self.artifacts = artifacts
+        self.engine = engine
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def info(self):
+        return {
+            "version": self.version,
+            "movies": len(self.artifacts),
+            "backend": self.engine.backend,
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_seconds": round(self.load_seconds, 4),
+            "built_at": (self.artifacts.manifest or {}).get("created_at"),
+        }
+
+
+class ModelRegistry:
+    def __init__(self, path, backend="exact", poll_interval=30.0, legacy_movies_path=None,
+                 legacy_neighbors_path=None, legacy_similarity_path=None):
+        self.path = path
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.legacy_paths = (legacy_movies_path, legacy_neighbors_path, legacy_similarity_path)
+        self._model = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.last_error = None
+        self.last_checked = None
+
+    def current(self):
+        """
+        The active model, or None if none could be loaded yet.
+        """
+        return self._model
+
+    def _probe(self):
+        """
+        Identifies the model on disk: the CURRENT version of a versioned root,
+        the manifest's modification time for a plain model directory, or
+        "legacy" when only the joblib files exist.
+        """
+        import model_store
+        version = model_store.current_version(self.path)
+        if version:
+            return version
+        try:
+            return f"mtime-{os.stat(os.path.join(self.path, model_store.MANIFEST)).st_mtime_ns}"
+        except FileNotFoundError:
+            return "legacy" if self.legacy_paths[0] and os.path.exists(self.legacy_paths[0]) else None
+
+    def _load(self, version):
+        import model_store
+        import recommender
+        started = time.perf_counter()
+        if version == "legacy":
+            artifacts = model_store.load_legacy_artifacts(*self.legacy_paths)
+        elif version.startswith("mtime-"):
+            artifacts = model_store.open_artifacts(self.path)
+        else:
+            # Open the version directory itself, so a CURRENT file replaced
+            # between probe and open cannot mix two versions
+            artifacts = model_store.open_artifacts(os.path.join(self.path, model_store.VERSIONS, version))
+        engine = recommender.Recommender(artifacts, backend=self.backend)
+        return LoadedModel(version, artifacts, engine, time.perf_counter() - started)
+
+    def load(self, version):
+        """
+        Opens a specific version without making it the active one.
+        """
+        return self._load(version)
+
+    def reload(self, force=False):
+        """
+        Loads the model on disk if it differs from the active one.
+
+        Returns True if a new model was swapped in. Load errors are recorded
+        and the previous model keeps serving.
+        """
+        with self._lock:
+            self.last_checked = datetime.now(timezone.utc)
+            version = self._probe()
+            active = self._model
+            if version is None or (not force and active is not None and active.version == version):
+                return False
+            try:
+                loaded = self._load(version)
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                logger.warning("could not load model version", extra={"version": version, "error": str(e)})
+                return False
+            self._model = loaded
+            self.last_error = None
+            self.reloads += 1
+            logger.info("model version loaded", extra={"version": version, "load_seconds": round(loaded.load_seconds, 3), "movies": len(loaded.artifacts)})
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
+
+    def start(self):
+        """
+        Starts polling for new versions every `poll_interval` seconds (0 disables it).
+        """
+        if self.poll_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self):
+        model = self._model
+        return {
+            "model": model.info() if model is not None else None,
+            "path": os.path.abspath(self.path),
+            "poll_interval": self.poll_interval,
+            "reloads": self.reloads,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+            "last_error": self.last_error,
+        }
+
+
+def default_registry(backend="exact", poll_interval=0):
+    """
+    The registry the API serves from: the model root `model` in the working
+    directory, or the legacy joblib files next to it.
+    """
+    return ModelRegistry(
+        'model',
+        backend=backend,
+        poll_interval=poll_interval,
+        legacy_movies_path='movies_df.joblib',
+        legacy_neighbors_path='neighbors.joblib',
+        legacy_similarity_path='similarity.joblib',
+    )
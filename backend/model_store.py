@@ -0,0 +1,326 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import unicodedata
+from datetime import datetime, timezone
+import numpy as np
+from neighbors import NeighborIndex, load_neighbor_index
+
+# On-disk model format: a directory of raw arrays that every worker opens with
+# mmap, so N uvicorn workers share a single page-cached copy of the model.
+#
+#   manifest.json          format version, movie count, K, creation time
+#   ids.npy                int64 TMDB id per row
+#   titles.offsets.npy     int64 byte offsets into titles.data (N + 1 entries)
+#   titles.data            UTF-8 titles, concatenated
+#   ids.sorted.npy         int64 ids in ascending order       } id -> row
+#   ids.rows.npy           int32 row of each sorted id        }
+#   titles.keys.npy        uint64 sorted title_key of titles  } title -> row
+#   titles.rows.npy        int32 row of each sorted key       }
+#   neighbor_indices.npy   int32 N x K
+#   neighbor_scores.npy    float32 N x K
+#
+# Builders publish each model as an immutable version under the model root:
+#
+#   CURRENT                name of the active version
+#   versions/<version>/    one model directory as above
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+VERSIONS = "versions"
+
+
+def normalize_title(title):
+    """
+    Canonical form used to match watchlist titles against the catalog.
+    """
+    return " ".join(unicodedata.normalize("NFKC", title).casefold().split())
+
+
+def title_key(title):
+    """
+    64-bit hash of the normalized title, stable across processes.
+    """
+    return _normalized_key(normalize_title(title))
+
+
+def _normalized_key(normalized):
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SortedIndex:
+    """
+    Read-only map of integer keys to rows: the keys in ascending order and the
+    row of each. Lookups are binary searches, so the arrays can be used
+    straight from the mmap without building anything per process.
+    """
+
+    def __init__(self, keys, rows):
+        # Plain ndarray views of the memmaps: indexing a memmap is several times slower
+        self.keys = np.asarray(keys)
+        self.rows = np.asarray(rows)
+        self._key_type = self.keys.dtype.type
+
+    @classmethod
+    def build(cls, keys, dtype=np.int64):
+        keys = np.asarray(keys, dtype=dtype)
+        # Stable, so rows sharing a key stay in row order and the first row wins
+        order = np.argsort(keys, kind="stable")
+        return cls(keys[order], order.astype(np.int32))
+
+    def find(self, key):
+        """
+        Yields the rows stored under `key`, in row order.
+        """
+        key = self._key_type(key)
+        position = int(self.keys.searchsorted(key))
+        while position < len(self.keys) and self.keys[position] == key:
+            yield int(self.rows[position])
+            position += 1
+
+    def find_first_many(self, keys):
+        """
+        Returns the first row stored under each of `keys`, or -1, with one vectorized search.
+        """
+        keys = np.asarray(keys, dtype=self.keys.dtype)
+        if len(self.keys) == 0:
+            return np.full(len(keys), -1, dtype=np.intp)
+        positions = np.minimum(self.keys.searchsorted(keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.rows[positions], -1).astype(np.intp)
+
+
+def build_id_index(ids):
+    return SortedIndex.build(ids, np.int64)
+
+
+def build_title_index(titles):
+    return SortedIndex.build([title_key(titles[i]) for i in range(len(titles))], np.uint64)
+
+
+class StringTable:
+    """
+    Read-only table of strings stored as one UTF-8 blob plus an offsets array.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [str(s).encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, b"".join(encoded))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+
+class ModelArtifacts:
+    """
+    Everything the API needs to serve recommendations.
+    """
+
+    def __init__(self, ids, titles, neighbor_index, manifest=None, ann=None, id_index=None, title_index=None):
+        self.ids = ids
+        self.titles = titles
+        self.neighbors = neighbor_index
+        self.manifest = manifest or {}
+        # Optional approximate nearest-neighbor index (ann.LSHIndex)
+        self.ann = ann
+        # Lookup tables written by save_artifacts; built in memory for models
+        # that predate them
+        self.id_index = id_index if id_index is not None else build_id_index(ids)
+        self.title_index = title_index if title_index is not None else build_title_index(titles)
+
+    def row_of_id(self, movie_id):
+        """
+        Returns the first row with TMDB id `movie_id`, or None.
+        """
+        return next(self.id_index.find(movie_id), None)
+
+    def rows_of_ids(self, movie_ids):
+        """
+        Returns the first row of each TMDB id in `movie_ids`, -1 for unknown ids.
+        """
+        return self.id_index.find_first_many(movie_ids)
+
+    def row_of_title(self, title):
+        """
+        Returns the first row whose normalized title equals that of `title`, or None.
+        """
+        normalized = normalize_title(title)
+        # Rows sharing the hash are compared in full, so collisions cannot match
+        for row in self.title_index.find(_normalized_key(normalized)):
+            if normalize_title(self.titles[row]) == normalized:
+                return row
+        return None
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def save_artifacts(path, ids, titles, neighbor_index, extra=None):
+    """
+    Writes model artifacts in the mmap-able directory format.
+    """
+    os.makedirs(path, exist_ok=True)
+    table = titles if isinstance(titles, StringTable) else StringTable.from_strings(titles)
+
+    ids = np.asarray(ids, dtype=np.int64)
+    np.save(os.path.join(path, "ids.npy"), ids)
+    np.save(os.path.join(path, "titles.offsets.npy"), table.offsets)
+    with open(os.path.join(path, "titles.data"), "wb") as f:
+        f.write(bytes(table.data))
+    id_index = build_id_index(ids)
+    np.save(os.path.join(path, "ids.sorted.npy"), id_index.keys)
+    np.save(os.path.join(path, "ids.rows.npy"), id_index.rows)
+    title_index = build_title_index(table)
+    np.save(os.path.join(path, "titles.keys.npy"), title_index.keys)
+    np.save(os.path.join(path, "titles.rows.npy"), title_index.rows)
+    np.save(os.path.join(path, "neighbor_indices.npy"), np.asarray(neighbor_index.indices, dtype=np.int32))
+    np.save(os.path.join(path, "neighbor_scores.npy"), np.asarray(neighbor_index.scores, dtype=np.float32))
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "count": int(len(table)),
+        "k": int(neighbor_index.k),
+        "created_at": time.time(),
+    }
+    manifest.update(extra or {})
+    # The manifest is written last so a directory without one is never opened.
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def current_version(root):
+    """
+    Returns the name of the active version under a model root, or None.
+    """
+    try:
+        with open(os.path.join(root, CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_model_dir(path):
+    """
+    Returns the directory holding the active model: the current version of a
+    versioned model root, or `path` itself for a plain model directory.
+    """
+    version = current_version(path)
+    return os.path.join(path, VERSIONS, version) if version else path
+
+
+def publish_version(root, write, keep=3):
+    """
+    Publishes a new model version atomically.
+
+    `write(directory, version)` fills a private temporary directory, which is
+    then renamed into versions/ and made current by atomically replacing the
+    CURRENT file. Readers therefore see either the old or the new version,
+    never a partial one. Only the `keep` most recent versions are kept.
+    """
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    versions_dir = os.path.join(root, VERSIONS)
+    os.makedirs(versions_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{version}.", dir=versions_dir)
+    try:
+        write(tmp_dir, version)
+        os.chmod(tmp_dir, 0o755)
+        final_dir = os.path.join(versions_dir, version)
+        os.rename(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    fd, tmp_current = tempfile.mkstemp(prefix=".CURRENT.", dir=root)
+    with os.fdopen(fd, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp_current, 0o644)
+    os.replace(tmp_current, os.path.join(root, CURRENT))
+
+    # Old versions can be removed while workers still map them; the kernel
+    # keeps unlinked files alive until they are unmapped.
+    published = sorted(v for v in os.listdir(versions_dir) if not v.startswith("."))
+    for old in published[:-keep]:
+        shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+    return version
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def open_artifacts(path):
+    """
+    Opens a model directory without reading the arrays into memory.
+
+    Only the manifest and the .npy headers are parsed, so opening takes the
+    same time whatever the size of the model. `path` may be a model directory
+    or a versioned model root.
+    """
+    path = resolve_model_dir(path)
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(manifest_path)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format: {manifest.get('format')}")
+
+    def array(name):
+        return np.load(os.path.join(path, name), mmap_mode="r")
+
+    titles = StringTable(array("titles.offsets.npy"), _map_file(os.path.join(path, "titles.data")))
+    neighbor_index = NeighborIndex(array("neighbor_indices.npy"), array("neighbor_scores.npy"))
+    ann_index = None
+    if manifest.get("ann"):
+        from ann import LSHIndex
+        ann_index = LSHIndex.open(path)
+    id_index = title_index = None
+    # Models written before the lookup tables existed get them built on open
+    if os.path.exists(os.path.join(path, "titles.rows.npy")):
+        id_index = SortedIndex(array("ids.sorted.npy"), array("ids.rows.npy"))
+        title_index = SortedIndex(array("titles.keys.npy"), array("titles.rows.npy"))
+    return ModelArtifacts(array("ids.npy"), titles, neighbor_index, manifest, ann=ann_index, id_index=id_index, title_index=title_index)
+
+
+def load_legacy_artifacts(movies_path, neighbors_path, legacy_similarity_path=None):
+    """
+    Builds in-memory artifacts from the old joblib files.
+    """
+    import joblib
+
+    if not os.path.exists(movies_path):
+        raise FileNotFoundError(movies_path)
+    movies = joblib.load(movies_path)
+    neighbor_index = load_neighbor_index(neighbors_path, legacy_similarity_path=legacy_similarity_path)
+    ids = movies["id"].to_numpy(dtype=np.int64)
+    titles = StringTable.from_strings(movies["title"].tolist())
+    return ModelArtifacts(ids, titles, neighbor_index, {"format": "joblib", "count": len(ids), "k": neighbor_index.k})
+
+
+def load_model(path, legacy_movies_path=None, legacy_neighbors_path=None, legacy_similarity_path=None):
+    """
+    Opens the mmap model directory, falling back to the legacy joblib files.
+    """
+    if os.path.exists(os.path.join(resolve_model_dir(path), MANIFEST)) or not legacy_movies_path:
+        return open_artifacts(path)
+    return load_legacy_artifacts(legacy_movies_path, legacy_neighbors_path, legacy_similarity_path)
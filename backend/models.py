@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, JSON, Index, DateTime
 from sqlalchemy.orm import relationship
 from database import Base # Corrected import
 
@@ -10,6 +10,9 @@ class User(Base):
     email = Column(String, unique=True, index=True) # Add this
     full_name = Column(String) # Add this
     hashed_password = Column(String)
+    # Incremented with every watchlist change, in the same transaction; tells
+    # whether materialized recommendations are still current
+    watchlist_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     watchlist_items = relationship("WatchlistItem", back_populates="owner")
 
@@ -29,4 +32,52 @@ class WatchlistItem(Base):
 
     # This creates the other side of the one-to-many relationship.
     # The 'owner' attribute on a WatchlistItem instance will be the User object it belongs to.
-    owner = relationship("User", back_populates="watchlist_items")
\ No newline at end of file
+    owner = relationship("User", back_populates="watchlist_items")
+
+    # (owner_id, id) serves every per-user read in id order, including keyset
+    # pagination; (owner_id, movie_id) keeps a movie on a watchlist only once.
+    # Existing databases get them from migrate_watchlist_indexes.py.
+    __table_args__ = (
+        Index("ix_watchlist_items_owner_id_id", "owner_id", "id"),
+        Index("ux_watchlist_items_owner_id_movie_id", "owner_id", "movie_id", unique=True),
+    )
+
+
+class Movie(Base):
+    """
+    Local copy of the TMDB catalog written by the model builder.
+
+    The movie endpoints serve from this table and only call TMDB on a miss.
+    """
+    __tablename__ = "movies"
+
+    id = Column(Integer, primary_key=True, index=True)  # TMDB movie id
+    title = Column(String, index=True)
+    overview = Column(Text)
+    release_date = Column(String)
+    release_year = Column(Integer, index=True)
+    poster_path = Column(String)
+    genre_ids = Column(JSON)
+    popularity = Column(Float, index=True)
+    vote_average = Column(Float)
+
+    # The TMDB movie details payload, returned as-is by /movies/{movie_id}
+    details = Column(JSON)
+
+
+class UserRecommendation(Base):
+    """
+    Recommendations precomputed by materialize_recommendations.py.
+
+    A row is served only while both the model version and the user's
+    watchlist_version match; otherwise the API computes on-line.
+    """
+    __tablename__ = "user_recommendations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    strategy = Column(String, primary_key=True)
+    model_version = Column(String, nullable=False)
+    watchlist_version = Column(Integer, nullable=False)
+    # The /recommendations/ response; null when no watchlist movie is in the model
+    payload = Column(JSON)
+    computed_at = Column(DateTime(timezone=True))
@@ -0,0 +1,102 @@
+import os
+import numpy as np
+import joblib
+
+# Number of neighbors kept per movie when the builder does not say otherwise.
+DEFAULT_K = 50
+
+
+class NeighborIndex:
+    """
+    Precomputed top-K neighbor table.
+
+    Row i holds the K most similar movies to movie i (excluding itself),
+    ordered by descending score. Indices are int32 and scores float32, so the
+    table costs N * K * 8 bytes instead of the N * N * 8 of the dense matrix.
+    """
+
+    def __init__(self, indices, scores):
+        if indices.shape != scores.shape:
+            raise ValueError("indices and scores must have the same shape")
+        self.indices = indices
+        self.scores = scores
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    def neighbors(self, row, n):
+        """
+        Returns (indices, scores) of the n best neighbors of a movie row.
+        """
+        return self.indices[row, :n], self.scores[row, :n]
+
+
+def top_k_rows(similarity, k, row_offset=0, row_ids=None, overwrite=False):
+    """
+    Selects the k best columns of every row of a (block of a) similarity matrix.
+
+    `row_offset` is the global row number of the first row in the block, so the
+    diagonal entry (a movie's similarity with itself) can be excluded. Blocks
+    of non-contiguous rows pass their global row numbers as `row_ids` instead.
+    With `overwrite`, a float32 block is modified in place instead of copied.
+    """
+    similarity = np.asarray(similarity, dtype=np.float32)
+    n_rows, n_cols = similarity.shape
+    k = min(k, n_cols - 1)
+    if k <= 0:
+        empty = np.empty((n_rows, 0))
+        return empty.astype(np.int32), empty.astype(np.float32)
+
+    block = similarity if overwrite else similarity.copy()
+    rows = np.arange(n_rows)
+    self_cols = np.asarray(row_ids) if row_ids is not None else rows + row_offset
+    in_block = self_cols < n_cols
+    block[rows[in_block], self_cols[in_block]] = -np.inf
+
+    # argpartition is O(N) per row; only the k survivors get fully sorted.
+    part = np.argpartition(block, -k, axis=1)[:, -k:]
+    part_scores = np.take_along_axis(block, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    indices = np.take_along_axis(part, order, axis=1).astype(np.int32)
+    scores = np.take_along_axis(part_scores, order, axis=1).astype(np.float32)
+    return indices, scores
+
+
+def build_neighbor_index(similarity, k=DEFAULT_K, block_size=1024):
+    """
+    Converts a dense N x N similarity matrix into a NeighborIndex.
+
+    Rows are processed in blocks so the float32 working copy never exceeds
+    block_size x N.
+    """
+    n = similarity.shape[0]
+    k = min(k, max(n - 1, 0))
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        indices[start:stop], scores[start:stop] = top_k_rows(similarity[start:stop], k, row_offset=start)
+    return NeighborIndex(indices, scores)
+
+
+def load_neighbor_index(path, legacy_similarity_path=None, k=DEFAULT_K):
+    """
+    Loads the top-K neighbor table saved by the model builder.
+
+    If it is missing but the old dense `similarity.joblib` is available, the
+    dense matrix is reduced to a top-K table in memory instead.
+    Raises FileNotFoundError when neither artifact exists.
+    """
+    if os.path.exists(path):
+        data = joblib.load(path)
+        return NeighborIndex(np.asarray(data["indices"], dtype=np.int32), np.asarray(data["scores"], dtype=np.float32))
+    if legacy_similarity_path and os.path.exists(legacy_similarity_path):
+        similarity = joblib.load(legacy_similarity_path)
+        index = build_neighbor_index(similarity, k=k)
+        del similarity
+        return index
+    raise FileNotFoundError(path)
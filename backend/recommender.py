@@ -0,0 +1,172 @@
+import os
+import numpy as np
+from metrics import RECOMMENDER_SECONDS
+
+_ANN_QUERY_SECONDS = RECOMMENDER_SECONDS.labels(stage="ann_query")
+_SIMILARITY_SECONDS = RECOMMENDER_SECONDS.labels(stage="similarity")
+_TOP_K_SECONDS = RECOMMENDER_SECONDS.labels(stage="top_k")
+_BLEND_SIMILARITY_SECONDS = RECOMMENDER_SECONDS.labels(stage="blend_similarity")
+_BLEND_TOP_K_SECONDS = RECOMMENDER_SECONDS.labels(stage="blend_top_k")
+
+# Weight of each older watchlist item relative to the next newer one when
+# blending recommendations over a whole watchlist.
+BLEND_DECAY = float(os.getenv("BLEND_DECAY", "0.9"))
+# Newest watchlist items considered by a blend; older ones carry almost no weight
+BLEND_MAX_ITEMS = int(os.getenv("BLEND_MAX_ITEMS", "500"))
+
+
+def top_k(scores, k, exclude=None):
+    """
+    Returns the positions of the k largest scores, best first.
+
+    Uses argpartition, so the cost is O(N + k log k) instead of the
+    O(N log N) of a full sort. Positions listed in `exclude` are never
+    returned.
+    """
+    scores = np.asarray(scores)
+    if exclude is not None and len(exclude):
+        scores = scores.astype(np.float32, copy=True)
+        scores[np.asarray(exclude, dtype=np.intp)] = -np.inf
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(scores.shape[0])
+    order = np.argsort(-scores[candidates], kind="stable")
+    best = candidates[order]
+    return best[np.isfinite(scores[best])]
+
+
+def latest_result(source_title, movies):
+    """
+    The /recommendations/ response of the "latest" strategy.
+    """
+    return {"source_movie": source_title, "recommendations": [{"id": m["id"], "title": m["title"]} for m in movies]}
+
+
+def blend_result(source_titles, movies):
+    """
+    The /recommendations/ response of the "blend" strategy.
+    """
+    return {
+        "source_movie": source_titles[0],
+        "source_movies": list(source_titles),
+        "recommendations": [{"id": m["id"], "title": m["title"]} for m in movies],
+    }
+
+
+class Recommender:
+    """
+    NumPy recommendation engine over a set of model artifacts.
+
+    Both backends serve the precomputed neighbor table. A model built with
+    --ann already fills that table from the same LSH query, so repeating the
+    query per request would only cost time. backend="ann" requires the LSH
+    index and queries it only for rows the table does not cover.
+    """
+
+    def __init__(self, artifacts, backend="exact"):
+        if backend not in ("exact", "ann"):
+            raise ValueError(f"Unknown recommender backend: {backend}")
+        if backend == "ann" and artifacts.ann is None:
+            raise ValueError("The ann backend needs a model built with an ANN index")
+        self.artifacts = artifacts
+        self.backend = backend
+
+    def lookup(self, movie_id=None, title=None):
+        """
+        Returns the model row of a movie, by TMDB id first and title second.
+
+        Both are binary searches over the model's sorted lookup tables, so the
+        first row wins when an id or title appears more than once.
+        """
+        if movie_id is not None:
+            row = self.artifacts.row_of_id(movie_id)
+            if row is not None:
+                return row
+        if title:
+            return self.artifacts.row_of_title(title)
+        return None
+
+    def lookup_many(self, movies):
+        """
+        lookup() for a list of (movie_id, title) pairs. Ids are searched in one
+        vectorized pass; titles are only tried for the ids that missed.
+        """
+        if not movies:
+            return []
+        rows = self.artifacts.rows_of_ids([-1 if movie_id is None else movie_id for movie_id, _ in movies]).tolist()
+        return [
+            row if row >= 0 else (self.artifacts.row_of_title(title) if title else None)
+            for row, (_, title) in zip(rows, movies)
+        ]
+
+    def _to_movies(self, rows, scores):
+        ids = self.artifacts.ids
+        titles = self.artifacts.titles
+        return [
+            {"id": int(ids[row]), "title": titles[row], "score": float(score)}
+            for row, score in zip(rows, scores)
+        ]
+
+    def similar(self, row, n=5):
+        """
+        Returns the n movies most similar to the movie at `row`.
+        """
+        if self.backend == "ann" and row >= len(self.artifacts.neighbors):
+            with _ANN_QUERY_SECONDS.time():
+                rows, scores = self.artifacts.ann.query(row, n)
+            return self._to_movies(rows, scores)
+        with _SIMILARITY_SECONDS.time():
+            candidates, candidate_scores = self.artifacts.neighbors.neighbors(row, self.artifacts.neighbors.k)
+        with _TOP_K_SECONDS.time():
+            best = top_k(candidate_scores, n)
+        return self._to_movies(candidates[best], candidate_scores[best])
+
+    def similar_batch(self, rows, n=5):
+        """
+        Returns the n movies most similar to each movie in `rows`.
+
+        The whole batch is answered with one gather from the neighbor table
+        and one sort over a len(rows) x K block; equal scores keep their order
+        in the table.
+        """
+        neighbor_index = self.artifacts.neighbors
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) == 0 or (self.backend == "ann" and rows.max() >= len(neighbor_index)):
+            return [self.similar(row, n) for row in rows.tolist()]
+        candidates = np.asarray(neighbor_index.indices[rows])
+        candidate_scores = np.asarray(neighbor_index.scores[rows])
+        best = np.argsort(-candidate_scores, axis=1, kind="stable")[:, :n]
+        indices = np.take_along_axis(candidates, best, axis=1)
+        scores = np.take_along_axis(candidate_scores, best, axis=1)
+        finite = np.isfinite(scores)
+        return [self._to_movies(i[f], s[f]) for i, s, f in zip(indices, scores, finite)]
+
+    def blend(self, rows, n=5, decay=0.9):
+        """
+        Recommends from a whole watchlist at once.
+
+        `rows` are model rows ordered most recent first; row i contributes its
+        neighbor scores weighted by decay ** i. The neighbor lists of every row
+        are gathered and summed per movie in one batched operation, movies in
+        `rows` are masked out and the global top n is returned.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if rows.size == 0:
+            return []
+        neighbor_index = self.artifacts.neighbors
+        with _BLEND_SIMILARITY_SECONDS.time():
+            candidates = np.asarray(neighbor_index.indices[rows]).ravel()
+            weights = decay ** np.arange(rows.size, dtype=np.float32)
+            contributions = (np.asarray(neighbor_index.scores[rows]) * weights[:, None]).ravel()
+
+            # Sum contributions per distinct candidate; the cost depends on the
+            # watchlist size and K only, not on the size of the catalog.
+            unique, inverse = np.unique(candidates, return_inverse=True)
+            totals = np.bincount(inverse, weights=contributions).astype(np.float32)
+        with _BLEND_TOP_K_SECONDS.time():
+            best = top_k(totals, n, exclude=np.flatnonzero(np.isin(unique, rows)))
+        return self._to_movies(unique[best], totals[best])
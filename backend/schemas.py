@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 import re
 
 # ==================================
@@ -21,6 +21,24 @@ class WatchlistItem(WatchlistItemBase):
     class Config:
         orm_mode = True
 
+# Most items accepted by one batch request
+WATCHLIST_BATCH_LIMIT = 1000
+
+class WatchlistBatchCreate(BaseModel):
+    items: list[WatchlistItemCreate] = Field(..., min_length=1, max_length=WATCHLIST_BATCH_LIMIT)
+
+class WatchlistBatchAddResult(BaseModel):
+    movie_id: int
+    status: str  # "added" or "duplicate"
+    item: Optional[WatchlistItem] = None
+
+class WatchlistBatchDelete(BaseModel):
+    item_ids: list[int] = Field(..., min_length=1, max_length=WATCHLIST_BATCH_LIMIT)
+
+class WatchlistBatchDeleteResult(BaseModel):
+    item_id: int
+    status: str  # "deleted", "not_found" or "duplicate"
+
 # ==================================
 # Schemas for Users
 # ==================================
@@ -51,6 +69,14 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
+
+class Principal(BaseModel):
+    """
+    The authenticated user as seen by endpoints that only need its identity.
+    """
+    id: int
+    username: str
 
 class UserCreate(UserBase):
     password: str
@@ -0,0 +1,122 @@
+import bisect
+import re
+import numpy as np
+from model_store import normalize_title
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_title(text or ""))
+
+
+class SearchIndex:
+    """
+    In-memory search engine over the local movie catalog.
+
+    Documents are numbered by descending popularity, so every posting list,
+    once sorted, is already in result order. A query is answered by
+    intersecting sorted NumPy arrays:
+
+    - an inverted index from title token to document ids; the last query
+      token also matches as a prefix through a sorted vocabulary,
+    - one packed bitset per genre,
+    - the documents sorted by release year, so a year range is one slice.
+    """
+
+    def __init__(self, movies):
+        movies = sorted(movies, key=lambda m: -(m.get("popularity") or 0))
+        self.movies = movies
+        n = len(movies)
+
+        postings = {}
+        genres = {}
+        years = np.full(n, -1, dtype=np.int32)
+        for doc, movie in enumerate(movies):
+            for token in set(tokenize(movie.get("title"))):
+                postings.setdefault(token, []).append(doc)
+            for genre_id in movie.get("genre_ids") or []:
+                genres.setdefault(genre_id, []).append(doc)
+            release_date = movie.get("release_date") or ""
+            if release_date[:4].isdigit():
+                years[doc] = int(release_date[:4])
+
+        self.postings = {token: np.array(docs, dtype=np.int32) for token, docs in postings.items()}
+        self.vocabulary = sorted(self.postings)
+        self.genre_bits = {}
+        for genre_id, docs in genres.items():
+            mask = np.zeros(n, dtype=bool)
+            mask[docs] = True
+            self.genre_bits[genre_id] = np.packbits(mask)
+        self.years = years
+        self.year_order = np.argsort(years, kind="stable").astype(np.int32)
+        self.sorted_years = years[self.year_order]
+
+    def __len__(self):
+        return len(self.movies)
+
+    def _prefix_postings(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        stop = bisect.bisect_left(self.vocabulary, prefix + "\U0010ffff")
+        lists = [self.postings[token] for token in self.vocabulary[start:stop]]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(lists))
+
+    def _year_range(self, start_year, end_year):
+        lo = np.searchsorted(self.sorted_years, start_year if start_year else 0, side="left")
+        hi = np.searchsorted(self.sorted_years, end_year if end_year else np.iinfo(np.int32).max, side="right")
+        return self.year_order[lo:hi]
+
+    def _has_genre(self, docs, genre_id):
+        bits = self.genre_bits.get(genre_id)
+        if bits is None:
+            return np.zeros(len(docs), dtype=bool)
+        return ((bits[docs >> 3] >> (7 - (docs & 7))) & 1).astype(bool)
+
+    def match(self, query, start_year=None, end_year=None, genre_id=None):
+        """
+        Returns the sorted document ids matching a query and its filters.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return np.empty(0, dtype=np.int32)
+
+        lists = [self.postings.get(token, np.empty(0, dtype=np.int32)) for token in tokens[:-1]]
+        lists.append(self._prefix_postings(tokens[-1]))
+        lists.sort(key=len)
+        docs = lists[0]
+        for other in lists[1:]:
+            if not len(docs):
+                break
+            docs = np.intersect1d(docs, other, assume_unique=True)
+
+        if len(docs) and (start_year or end_year):
+            in_range = self._year_range(start_year, end_year)
+            if len(in_range) < len(docs):
+                docs = np.intersect1d(docs, np.sort(in_range), assume_unique=True)
+            else:
+                years = self.years[docs]
+                keep = years >= 0
+                if start_year:
+                    keep &= years >= start_year
+                if end_year:
+                    keep &= years <= end_year
+                docs = docs[keep]
+        if len(docs) and genre_id:
+            docs = docs[self._has_genre(docs, genre_id)]
+        return docs
+
+    def search(self, query, start_year=None, end_year=None, genre_id=None, page=1, page_size=20):
+        """
+        Returns one page of results in the shape of a TMDB search response.
+        """
+        docs = self.match(query, start_year, end_year, genre_id)
+        total = len(docs)
+        start = (page - 1) * page_size
+        return {
+            "page": page,
+            "results": [self.movies[doc] for doc in docs[start:start + page_size]],
+            "total_pages": -(-total // page_size),
+            "total_results": total,
+        }
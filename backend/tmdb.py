@@ -0,0 +1,169 @@
+import asyncio
+import os
+import re
+import time
+import metrics
+from cache import MemoryBackend
+
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+# Movie ids in paths are folded into one metrics label
+_PATH_IDS = re.compile(r"/\d+")
+
+
+class TMDBError(Exception):
+    """
+    Raised when TMDB cannot be reached or answers with an error status.
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TMDBClient:
+    """
+    Shared async TMDB client.
+
+    One pooled httpx.AsyncClient with strict timeouts, a TTL+LRU response
+    cache keyed on the normalized request, and coalescing of identical
+    in-flight requests so concurrent misses trigger a single upstream call.
+    """
+
+    def __init__(self, api_key, base_url=TMDB_BASE_URL, max_connections=20, timeout=5.0, cache_ttl=300, cache_size=2048):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.cache_ttl = cache_ttl
+        self.cache = MemoryBackend(max_entries=cache_size)
+        # httpx is imported on first use; it is a large share of the API's import time
+        import httpx
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(timeout, connect=min(timeout, 2.0))
+        self._client = None
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_requests = 0
+        self.errors = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self._limits, timeout=self._timeout)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def cache_key(path, params):
+        normalized = sorted(
+            (key, value.strip().lower() if isinstance(value, str) else value)
+            for key, value in params.items()
+            if value is not None
+        )
+        return f"{path}?{normalized}"
+
+    async def get(self, path, **params):
+        """
+        Returns the decoded JSON of a TMDB GET request.
+
+        The returned object may be shared with other callers: do not mutate it.
+        """
+        if isinstance(params.get("query"), str):
+            params["query"] = " ".join(params["query"].split())
+        key = self.cache_key(path, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, path, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled caller does not cancel the shared fetch.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, path, params):
+        import httpx
+        self.upstream_requests += 1
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.client.get(path, params={"api_key": self.api_key, **params})
+            outcome = str(response.status_code)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            self.errors += 1
+            raise TMDBError(str(e), status_code=e.response.status_code) from e
+        except (httpx.HTTPError, ValueError) as e:
+            self.errors += 1
+            raise TMDBError(str(e)) from e
+        finally:
+            metrics.TMDB_SECONDS.observe(time.perf_counter() - started, path=_PATH_IDS.sub("/{id}", path), outcome=outcome)
+        self.cache.set(key, data, ttl=self.cache_ttl)
+        return data
+
+    async def search_movies(self, query, page=1):
+        return await self.get("/search/movie", language="en-US", query=query, page=page, include_adult="false")
+
+    async def popular_movies(self, page=1):
+        return await self.get("/movie/popular", language="en-US", page=page)
+
+    async def movie_details(self, movie_id):
+        return await self.get(f"/movie/{int(movie_id)}", language="en-US")
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "upstream_requests": self.upstream_requests,
+            "errors": self.errors,
+            "cached_responses": len(self.cache),
+        }
+
+
+_client = None
+
+
+def get_client():
+    """
+    Returns the process-wide TMDB client, creating it on first use.
+
+    Raises TMDBError when no API key is configured.
+    """
+    global _client
+    if _client is None:
+        api_key = os.getenv("API_KEY")
+        if not api_key:
+            raise TMDBError("TMDB API key not configured")
+        _client = TMDBClient(
+            api_key,
+            max_connections=int(os.getenv("TMDB_MAX_CONNECTIONS", "20")),
+            timeout=float(os.getenv("TMDB_TIMEOUT", "5")),
+            cache_ttl=int(os.getenv("TMDB_CACHE_TTL", "300")),
+            cache_size=int(os.getenv("TMDB_CACHE_SIZE", "2048")),
+        )
+    return _client
+
+
+def stats():
+    return _client.stats() if _client is not None else None
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,6 @@
+"""
+Benchmark and load-test suite.
+
+Every module is also a standalone script (python benchmarks/<name>.py --help).
+`python -m benchmarks` runs a whole suite; see __main__.py.
+"""
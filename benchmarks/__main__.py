@@ -0,0 +1,74 @@
+"""
+Runs the benchmark suites one script at a time, each in its own process.
+
+    micro  recommendation path, top-k, search, auth, metrics overhead, model builder,
+           materialization batches
+    load   end-to-end API load harness (stub TMDB + SQLite unless --database-url),
+           streaming export TTFB and memory, import time and time to first request
+
+Usage (from the repository root):
+    python -m benchmarks [micro] [load] [--quick] [--out results/] [--compare results-old/]
+
+With --out, scripts that support it save JSON results there; --compare points
+them at the files of an earlier --out directory.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# script -> (arguments with --quick, whether it writes --json results)
+SUITES = {
+    "micro": {
+        "bench_recommender": (["--sizes", "10000", "--queries", "500"], True),
+        "bench_topk": (["--sizes", "5000", "50000", "--repeat", "5"], False),
+        "bench_search": (["--sizes", "10000", "--queries", "200"], False),
+        "bench_auth": (["--requests", "1000", "--users", "1000"], False),
+        "bench_metrics": (["--number", "20000"], False),
+        "bench_builder": (["--sizes", "2000"], True),
+        "bench_materialize": (["--sizes", "10000", "--users", "2000"], True),
+    },
+    "load": {
+        "load_api": (["--duration", "5", "--warmup", "1", "--users", "5", "--concurrency", "8"], True),
+        "bench_export": (["--sizes", "10000"], True),
+        "bench_startup": (["--movies", "10000", "--repeat", "2"], True),
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("suites", nargs="*", default=["micro"], metavar="suite", help=f"One or more of {', '.join(SUITES)} (default: micro)")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and shorter runs, for a smoke check")
+    parser.add_argument("--out", help="Directory for JSON results")
+    parser.add_argument("--compare", help="Directory with the JSON results of an earlier run")
+    parser.add_argument("--database-url", help="Passed to load_api")
+    args = parser.parse_args()
+    unknown = [suite for suite in args.suites if suite not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite: {', '.join(unknown)}")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    failed = []
+    for suite in args.suites:
+        for script, (quick_args, writes_json) in SUITES[suite].items():
+            command = [sys.executable, os.path.join(BENCHMARKS_DIR, f"{script}.py")] + (quick_args if args.quick else [])
+            if writes_json and args.out:
+                command += ["--json", os.path.join(args.out, f"{script}.json")]
+            if writes_json and args.compare and os.path.exists(os.path.join(args.compare, f"{script}.json")):
+                command += ["--compare", os.path.join(args.compare, f"{script}.json")]
+            if script == "load_api" and args.database_url:
+                command += ["--database-url", args.database_url]
+            print(f"\n=== {script} ===", flush=True)
+            if subprocess.run(command).returncode != 0:
+                failed.append(script)
+    if failed:
+        print(f"⚠️ Failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
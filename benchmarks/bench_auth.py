@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: cost of resolving the caller of an authenticated request.
+
+Compares, per request:
+    user lookup     auth.get_current_user (JWT decode + users row as an ORM object)
+    principal miss  auth.get_current_principal with an empty principal cache
+    principal hit   auth.get_current_principal answered from the cache
+    uid claim       auth.get_current_principal with the user id in the token
+
+Runs against a local SQLite file, so the database numbers are a lower bound:
+against Postgres over a network every avoided query also saves a round trip
+(add it with --db-latency-ms).
+
+Usage (from the repository root):
+    python benchmarks/bench_auth.py [--requests 5000] [--users 10000] [--db-latency-ms 0]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import models
+import crud  # imported before auth, as in main.py (auth and crud import each other)
+import auth
+from cache import principal_cache
+
+
+def setup_database(path, users, latency):
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "full_name": f"User {i}", "hashed_password": "x"}
+            for i in range(users)
+        ])
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    if latency:
+        # Blocks the aiosqlite worker thread, like a network round trip would
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def simulate_round_trip(*args):
+            time.sleep(latency)
+    return async_engine, async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+async def measure(Session, resolve, tokens):
+    timings = []
+    for token in tokens:
+        async with Session() as db:
+            started = time.perf_counter()
+            await resolve(token=token, db=db)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        async_engine, Session = setup_database(os.path.join(tmp, "bench.sqlite3"), args.users, args.db_latency_ms / 1000)
+        try:
+            # A few hundred active users, each making several requests
+            active = min(args.users, 500)
+            subjects = [(i % active) + 1 for i in range(args.requests)]
+            plain = {uid: auth.create_access_token({"sub": f"user{uid - 1}"}) for uid in set(subjects)}
+            with_uid = {uid: auth.create_access_token({"sub": f"user{uid - 1}", "uid": uid}) for uid in set(subjects)}
+
+            async def principal_miss(token, db):
+                principal_cache._data.clear()
+                return await auth.get_current_principal(token=token, db=db)
+
+            cases = [
+                ("user lookup", auth.get_current_user, [plain[s] for s in subjects]),
+                ("principal miss", principal_miss, [plain[s] for s in subjects]),
+                ("principal hit", auth.get_current_principal, [plain[s] for s in subjects]),
+                ("uid claim", auth.get_current_principal, [with_uid[s] for s in subjects]),
+            ]
+            print(f"{'case':>16} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+            baseline = None
+            for name, resolve, tokens in cases:
+                timings = await measure(Session, resolve, tokens)
+                mean = statistics.fmean(timings)
+                baseline = baseline or mean
+                p99 = sorted(timings)[int(len(timings) * 0.99)]
+                print(f"{name:>16} {statistics.median(timings):>9.3f} {p99:>9.3f} {mean:>9.3f}  (saves {baseline - mean:.3f} ms)")
+        finally:
+            # aiosqlite's worker thread would otherwise keep the interpreter alive
+            await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
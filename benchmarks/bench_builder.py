@@ -0,0 +1,184 @@
+"""
+Micro-benchmark: the model builder's stages at synthetic catalog sizes.
+
+Runs the builder code in Model/recommendation_model.py on the deterministic
+catalog of the stub TMDB server (no network), with two feature pipelines:
+    tags     the pipeline before Model/features.py: overview, genres,
+             keywords, cast and director joined into one tag text and
+             re-tokenized by CountVectorizer
+    fields   integer-coded per-field features (FeatureVocabulary)
+and times each stage:
+    tags / extract      tag text, or per-field token lists
+    vectorize / encode  counts + L2 normalization
+    neighbors           sparse blocked top-K similarity (sparse_top_k)
+    ann                 LSH index build (with --ann)
+    publish             writing a model version (in a temporary directory)
+
+The size of the published version is reported too: the builder state kept
+for incremental builds (vectors.npz and vocabulary.json) and the whole
+version directory.
+
+Usage (from the repository root):
+    python benchmarks/bench_builder.py [--sizes 2000 10000] [--pipelines tags fields] [--weights director=2] [--ann]
+        [--json out.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import MODEL_DIR, change, load_report, write_report
+from stub_tmdb import Catalog
+sys.path.insert(0, MODEL_DIR)
+import recommendation_model as builder
+from features import FeatureVocabulary, extract_fields, parse_weights
+from model_store import publish_version, resolve_model_dir, save_artifacts
+from similarity import Timer, peak_rss_mb, sparse_top_k
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+PIPELINES = ("tags", "fields")
+
+
+# --- The tag-text pipeline, as the builder ran it before features.py ---
+
+def _names(data, limit=3):
+    return [i['name'] for i in data[:limit]] if isinstance(data, list) else []
+
+
+def _director(crew):
+    if isinstance(crew, list):
+        for member in crew:
+            if member['job'] == 'Director':
+                return [member['name']]
+    return []
+
+
+def build_tags(movies_df, all_details):
+    details_df = pd.json_normalize(all_details)
+    movies_df = movies_df.drop(columns=[col for col in details_df.columns if col in movies_df.columns and col != 'id'], errors='ignore')
+    movies_df = pd.merge(movies_df, details_df, on='id', how='inner')
+    movies = movies_df[['id', 'title', 'overview', 'genres', 'keywords.keywords', 'credits.cast', 'credits.crew']].copy()
+    movies['genres'] = movies['genres'].apply(_names)
+    movies['keywords.keywords'] = movies['keywords.keywords'].apply(_names)
+    movies['credits.cast'] = movies['credits.cast'].apply(_names)
+    movies['credits.crew'] = movies['credits.crew'].apply(_director)
+    movies.rename(columns={'keywords.keywords': 'keywords', 'credits.cast': 'cast', 'credits.crew': 'director'}, inplace=True)
+    for feature in ['genres', 'keywords', 'cast', 'director']:
+        movies[feature] = movies[feature].apply(lambda x: [i.replace(" ", "") for i in x] if isinstance(x, list) else [])
+    movies['tags'] = movies['overview'].fillna('').apply(lambda x: x.split()) + \
+        movies['genres'] + movies['keywords'] + movies['cast'] + movies['director']
+    movies['tags'] = movies['tags'].apply(lambda x: " ".join(x).lower())
+    return movies[['id', 'title', 'tags']].reset_index(drop=True)
+
+
+def publish_tags_model(root, ids, titles, neighbor_index, vocabulary, counts):
+    def write(directory, version):
+        save_artifacts(directory, ids, titles, neighbor_index, extra={'version': version, 'mode': 'full'})
+        sparse.save_npz(os.path.join(directory, builder.VECTORS_FILE), counts.astype(np.int32))
+        with open(os.path.join(directory, builder.VOCABULARY_FILE), 'w') as f:
+            json.dump(vocabulary, f)
+    publish_version(root, write)
+
+
+# --- Benchmark ---
+
+def model_bytes(root):
+    directory = resolve_model_dir(root)
+    sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)}
+    return {
+        "state": sizes.get(builder.VECTORS_FILE, 0) + sizes.get(builder.VOCABULARY_FILE, 0),
+        "total": sum(sizes.values()),
+    }
+
+
+def run_pipeline(pipeline, movies_df, all_details, args):
+    stages = {}
+    if pipeline == "tags":
+        with Timer() as timer:
+            final_df = build_tags(movies_df, all_details)
+        stages["tags"] = timer.elapsed
+        with Timer() as timer:
+            cv = CountVectorizer(max_features=5000, stop_words='english')
+            counts = cv.fit_transform(final_df['tags'])
+            vectors = normalize(counts.astype(np.float32))
+        stages["vectorize"] = timer.elapsed
+        ids, titles = final_df['id'].to_numpy(), final_df['title'].tolist()
+    else:
+        with Timer() as timer:
+            details = builder.select_details(movies_df, all_details)
+            fields = extract_fields(details)
+        stages["extract"] = timer.elapsed
+        with Timer() as timer:
+            vocabulary, counts = FeatureVocabulary.fit(fields, parse_weights(args.weights))
+            vectors = vocabulary.vectors(counts)
+        stages["encode"] = timer.elapsed
+        ids, titles = np.asarray([movie['id'] for movie in details], dtype=np.int64), [movie['title'] for movie in details]
+
+    with Timer() as timer:
+        neighbor_index = sparse_top_k(vectors, args.k, budget_mb=args.block_mb, workers=args.workers)
+    stages["neighbors"] = timer.elapsed
+    ann_index = None
+    if args.ann:
+        with Timer() as timer:
+            ann_index = builder.LSHIndex.build(vectors, n_tables=builder.ANN_TABLES, n_bits=builder.ANN_BITS)
+        stages["ann"] = timer.elapsed
+    with tempfile.TemporaryDirectory() as tmp:
+        with Timer() as timer:
+            if pipeline == "tags":
+                publish_tags_model(tmp, ids, titles, neighbor_index, {term: int(i) for term, i in cv.vocabulary_.items()}, counts)
+            else:
+                builder.MODEL_DIR = tmp
+                builder.publish_model(ids, titles, neighbor_index, vocabulary, counts, 'full', ann_index)
+        stages["publish"] = timer.elapsed
+        size = model_bytes(tmp)
+    stages["total"] = sum(stages.values())
+    return {"seconds": stages, "features": int(vectors.shape[1]), "vector_nnz": int(vectors.nnz), "model_bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 10_000])
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES))
+    parser.add_argument("--weights", default="", help="Feature weights of the fields pipeline, e.g. director=2,overview=0.5")
+    parser.add_argument("--k", type=int, default=builder.NEIGHBORS_K)
+    parser.add_argument("--block-mb", type=int, default=builder.SIMILARITY_BLOCK_MB)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--ann", action="store_true", help="Also time the LSH index build")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    baseline = load_report(args.compare)["results"] if args.compare else {}
+    results = {}
+    for n in args.sizes:
+        catalog = Catalog(n, seed=args.seed)
+        movies_df = pd.DataFrame([Catalog.summary(movie) for movie in catalog.movies])
+        all_details = [catalog.details(movie, ["credits", "keywords"]) for movie in catalog.movies]
+        size_results = results[str(n)] = {}
+        for pipeline in args.pipelines:
+            result = size_results[pipeline] = run_pipeline(pipeline, movies_df, all_details, args)
+            old = baseline.get(str(n), {}).get(pipeline, {}).get("seconds", {})
+            print(f"{n} movies, {pipeline} ({result['features']} features, {result['vector_nnz']} non-zeros, "
+                  f"builder state {result['model_bytes']['state'] / 2 ** 20:.2f} MB, version {result['model_bytes']['total'] / 2 ** 20:.2f} MB):")
+            for stage, seconds in result["seconds"].items():
+                print(f"  {stage:>10} {seconds:>9.3f}s" + (f"  {change(seconds, old[stage])}" if stage in old else ""))
+        if len(size_results) == len(PIPELINES):
+            tags, fields = size_results["tags"], size_results["fields"]
+            feature_seconds = lambda result: result["seconds"]["total"] - result["seconds"]["neighbors"] - result["seconds"].get("ann", 0) - result["seconds"]["publish"]
+            print(f"  fields vs tags: features {feature_seconds(fields):.3f}s vs {feature_seconds(tags):.3f}s ({change(feature_seconds(fields), feature_seconds(tags))}), "
+                  f"builder state {change(fields['model_bytes']['state'], tags['model_bytes']['state'])}, "
+                  f"version {change(fields['model_bytes']['total'], tags['model_bytes']['total'])}")
+        size_results["peak_rss_mb"] = peak_rss_mb()[0]
+    if args.json:
+        write_report(args.json, "builder", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark: streaming exports vs the in-memory watchlist response.
+
+For every watchlist size, a user with that many items is written to a
+temporary SQLite database and these are fetched from a uvicorn server:
+    list      GET /watchlist/ (ORM objects -> Pydantic models -> one JSON body)
+    ndjson    GET /watchlist/export?format=ndjson
+    csv       GET /watchlist/export?format=csv
+    catalog   GET /movies/export?format=ndjson (a catalog of the same size)
+
+Reported: time to first byte, total time, bytes, and the server's peak RSS
+growth during the request (sampled from /proc every few milliseconds, so
+Linux only). Each measurement uses a fresh server after one small warm-up
+request, so memory freed by an earlier request does not hide the growth.
+
+Usage (from the repository root):
+    python benchmarks/bench_export.py [--sizes 10000 100000] [--json out.json]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import BACKEND_DIR, free_port, write_report
+
+PASSWORD = "export1234"
+CASES = {
+    "list": ("/watchlist/", {}),
+    "ndjson": ("/watchlist/export", {"format": "ndjson"}),
+    "csv": ("/watchlist/export", {"format": "csv"}),
+    "catalog": ("/movies/export", {"format": "ndjson"}),
+}
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class PeakRSS:
+    """
+    Samples the RSS of a process in a background thread while in a `with` block.
+    """
+
+    def __init__(self, pid, interval=0.002):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_mb(self.pid))
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.baseline = rss_mb(self.pid)
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.growth = max(0.0, self.peak - self.baseline)
+
+
+def seed(database_url, sizes):
+    """
+    Creates one user per size (plus a one-item warm-up user) and a catalog of max(sizes) movies.
+    """
+    os.environ["DATABASE_URL"] = database_url
+    import models
+    from database import engine
+    from hashing import pwd_context
+    models.Base.metadata.create_all(bind=engine)
+    hashed = pwd_context.hash(PASSWORD)
+    with engine.begin() as conn:
+        for i, size in enumerate([1] + sizes):
+            user_id = conn.execute(models.User.__table__.insert().values(
+                username=f"export{size}", email=f"export{size}@example.com", full_name="Export", hashed_password=hashed)).inserted_primary_key[0]
+            conn.execute(models.WatchlistItem.__table__.insert(), [
+                {"owner_id": user_id, "movie_id": 1000 + j, "movie_title": f"Movie Title {j}"} for j in range(size)])
+        conn.execute(models.Movie.__table__.insert(), [
+            {"id": 1000 + j, "title": f"Movie Title {j}", "overview": "An overview of about this length " * 4, "release_date": "2001-01-01",
+             "release_year": 2001, "genre_ids": [18, 35], "poster_path": f"/p{j}.jpg", "popularity": 1.0, "vote_average": 5.0, "details": {"id": 1000 + j}}
+            for j in range(max(sizes))])
+    engine.dispose()
+
+
+def start_server(tmp, database_url, port):
+    env = {**os.environ, "DATABASE_URL": database_url, "MODEL_RELOAD_INTERVAL": "0", "PASSWORD_HASH_WORKERS": "0", "LOG_LEVEL": "WARNING", "SLOW_REQUEST_MS": "0"}
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(port), "--log-level", "warning"],
+                            cwd=tmp, env=env, stdout=subprocess.DEVNULL)
+
+
+def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get("/").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+def fetch(client, path, params, headers):
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    with client.stream("GET", path, params=params, headers=headers) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+    return first_byte or 0.0, time.perf_counter() - started, size
+
+
+def measure(tmp, database_url, size, case):
+    path, params = CASES[case]
+    port = free_port()
+    server = start_server(tmp, database_url, port)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=300) as client:
+            wait_ready(client)
+
+            def login(username):
+                token = client.post("/token", data={"username": username, "password": PASSWORD}).json()["access_token"]
+                return {"Authorization": f"Bearer {token}"}
+
+            fetch(client, path, params, login("export1"))
+            headers = login(f"export{size}")
+            with PeakRSS(server.pid) as rss:
+                ttfb, total, size_bytes = fetch(client, path, params, headers)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"ttfb_ms": ttfb * 1000, "total_ms": total * 1000, "bytes": size_bytes, "rss_growth_mb": rss.growth}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'export.sqlite3')}"
+        seed(database_url, args.sizes)
+        print(f"{'items':>8} {'case':>8} {'TTFB ms':>9} {'total ms':>9} {'MB':>7} {'RSS +MB':>8}")
+        for size in args.sizes:
+            for case in args.cases:
+                result = results.setdefault(str(size), {})[case] = measure(tmp, database_url, size, case)
+                print(f"{size:>8} {case:>8} {result['ttfb_ms']:>9.1f} {result['total_ms']:>9.1f} {result['bytes'] / 2 ** 20:>7.1f} {result['rss_growth_mb']:>8.1f}")
+    if args.json:
+        write_report(args.json, "export", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: materializing recommendations, per user vs per batch.
+
+For every catalog size a synthetic model is published and opened
+memory-mapped, and --users synthetic watchlists of --watchlist movies are
+answered three ways:
+    per-user latest   Recommender.similar once per user (the on-line path)
+    batch latest      materialize_recommendations.compute_batch, "latest" only
+    batch both        compute_batch with "latest" and "blend", as the job runs
+
+Reported in users per second; --batch-size users go into each compute_batch
+call, as in the job.
+
+Usage (from the repository root):
+    python benchmarks/bench_materialize.py [--sizes 10000 100000] [--users 20000] [--json out.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import publish_synthetic_model, write_report
+
+# materialize_recommendations imports database; never touch a real one
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_materialize.sqlite3')}")
+import model_store
+import recommender
+from materialize_recommendations import TOP_N, compute_batch
+
+
+def users_per_second(fn, users):
+    started = time.perf_counter()
+    fn()
+    return users / (time.perf_counter() - started)
+
+
+def run_size(n, args):
+    rng = np.random.default_rng(args.seed)
+    ids = np.arange(n, dtype=np.int64) + 1000
+    titles = [f"Movie Title {i}" for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        publish_synthetic_model(tmp, ids, titles, k=args.k, seed=args.seed)
+        engine = recommender.Recommender(model_store.open_artifacts(tmp))
+        users = []
+        for user_id in range(args.users):
+            rows = rng.integers(0, n, size=args.watchlist)
+            users.append((user_id, 1, [(int(ids[row]), titles[row]) for row in rows]))
+        batches = [users[i:i + args.batch_size] for i in range(0, len(users), args.batch_size)]
+
+        def per_user():
+            for _, _, sources in users:
+                movie_id, title = sources[0]
+                recommender.latest_result(title, engine.similar(engine.lookup(movie_id, title), TOP_N))
+
+        def batch(strategies):
+            return lambda: [compute_batch(engine, chunk, strategies) for chunk in batches]
+
+        return {
+            "per-user latest": users_per_second(per_user, len(users)),
+            "batch latest": users_per_second(batch(("latest",)), len(users)),
+            "batch both": users_per_second(batch(("latest", "blend")), len(users)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--watchlist", type=int, default=10, help="Movies per synthetic watchlist")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'movies':>8} {'case':>16} {'users/s':>10}")
+    for n in args.sizes:
+        results[str(n)] = run_size(n, args)
+        for case, rate in results[str(n)].items():
+            print(f"{n:>8} {case:>16} {rate:>10.0f}")
+    if args.json:
+        write_report(args.json, "materialize", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: overhead of the instrumentation in metrics.py.
+
+Times a bare Histogram.observe, `with` timer blocks (labels passed per call,
+and bound once with Histogram.labels) and a Prometheus scrape, and compares
+the timers with the hot section they wrap in Recommender.similar (top-k over
+a K=50 neighbor row).
+
+Usage (from the repository root):
+    python benchmarks/bench_metrics.py [--number 200000]
+"""
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+import metrics
+from recommender import top_k
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    histogram = metrics.Histogram("bench_seconds", "Benchmark histogram.", ("stage",))
+    series = histogram.labels(stage="top_k")
+    scores = np.random.default_rng(0).random(50, dtype=np.float32)
+
+    def empty_block():
+        with histogram.time(stage="top_k"):
+            pass
+
+    def bound_block():
+        with series.time():
+            pass
+
+    def timed_top_k():
+        with series.time():
+            top_k(scores, 5)
+
+    cases = [
+        ("observe", lambda: histogram.observe(0.0001, stage="top_k")),
+        ("time() block", empty_block),
+        ("bound block", bound_block),
+        ("top_k (K=50)", lambda: top_k(scores, 5)),
+        ("timed top_k", timed_top_k),
+    ]
+    print(f"{'case':>14} {'us/call':>9}")
+    for name, fn in cases:
+        print(f"{name:>14} {per_call_us(fn, args.number):>9.3f}")
+    print(f"{'scrape':>14} {per_call_us(metrics.render, 200):>9.1f}  ({len(metrics.render().splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
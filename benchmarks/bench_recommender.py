@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: the recommendation hot path at synthetic catalog sizes.
+
+For every size a synthetic model is published and opened memory-mapped, as
+the API does, and each step of a request is timed on its own:
+    lookup id     Recommender.lookup by TMDB id
+    lookup title  Recommender.lookup by title (normalization + hash)
+    top_k         recommender.top_k over one K-wide neighbor row
+    titles        mapping result rows to {"id", "title", "score"} dicts
+    similar       Recommender.similar (the whole "latest" strategy)
+    blend         Recommender.blend over a watchlist of --watchlist movies
+
+Queries use a fixed seed, so two runs on the same machine time the same work.
+
+Usage (from the repository root):
+    python benchmarks/bench_recommender.py [--sizes 10000 100000] [--queries 2000] [--json out.json] [--compare old.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import change, load_report, publish_synthetic_model, summarize, write_report
+import model_store
+from recommender import Recommender, top_k
+
+
+def time_each(fn, args):
+    timings = []
+    for arg in args:
+        started = time.perf_counter()
+        fn(arg)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def run_size(n, args):
+    rng = np.random.default_rng(args.seed)
+    ids = np.arange(n, dtype=np.int64) + 1000
+    titles = [f"Movie Title {i}" for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        publish_synthetic_model(tmp, ids, titles, k=args.k, seed=args.seed)
+        engine = Recommender(model_store.open_artifacts(tmp))
+        rows = rng.integers(0, n, size=args.queries).tolist()
+        neighbors = engine.artifacts.neighbors
+        watchlists = [rng.integers(0, n, size=args.watchlist) for _ in range(max(1, args.queries // 10))]
+        row_scores = [np.asarray(neighbors.scores[row]) for row in rows]
+        best = [(np.asarray(neighbors.indices[row, :5]), np.asarray(neighbors.scores[row, :5])) for row in rows]
+
+        cases = {
+            "lookup id": time_each(engine.lookup, [int(ids[row]) for row in rows]),
+            "lookup title": time_each(lambda title: engine.lookup(None, title), [titles[row].upper() for row in rows]),
+            "top_k": time_each(lambda scores: top_k(scores, 5), row_scores),
+            "titles": time_each(lambda pair: engine._to_movies(*pair), best),
+            "similar": time_each(engine.similar, rows),
+            "blend": time_each(engine.blend, watchlists),
+        }
+        # Drop the engine before the temporary directory goes, it maps files in it
+        del engine, neighbors
+    return {name: summarize(timings) for name, timings in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--watchlist", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results of an earlier run to compare p50s with")
+    args = parser.parse_args()
+
+    baseline = load_report(args.compare)["results"] if args.compare else {}
+    results = {}
+    print(f"{'movies':>9} {'case':>13} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}" + (f" {'p50 vs old':>11}" if baseline else ""))
+    for n in args.sizes:
+        results[str(n)] = run_size(n, args)
+        for name, stats in results[str(n)].items():
+            old = baseline.get(str(n), {}).get(name)
+            print(f"{n:>9} {name:>13} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}"
+                  + (f" {change(stats['p50'], old['p50']) if old else 'n/a':>11}" if baseline else ""))
+    if args.json:
+        write_report(args.json, "recommender", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
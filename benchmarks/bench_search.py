@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: local catalog search latency against catalog size.
+
+Compares search_index.SearchIndex with a linear scan that filters title,
+genre and year in Python list comprehensions (what /movies/search did with
+TMDB results).
+
+Usage (from the repository root):
+    python benchmarks/bench_search.py [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from search_index import SearchIndex
+
+from stub_tmdb import GENRES, WORDS
+
+
+def synthetic_catalog(n, seed=0):
+    rng = random.Random(seed)
+    genre_ids = [g for g, _ in GENRES]
+    return [
+        {
+            "id": i,
+            "title": " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4))),
+            "release_date": f"{rng.randint(1950, 2025)}-01-01",
+            "genre_ids": rng.sample(genre_ids, rng.randint(1, 3)),
+            "popularity": rng.random() * 100,
+        }
+        for i in range(n)
+    ]
+
+
+def linear_search(movies, query, start_year, end_year, genre_id):
+    query = query.lower()
+    results = [m for m in movies if query in m["title"].lower()]
+    if genre_id:
+        results = [m for m in results if genre_id in m.get("genre_ids", [])]
+    if start_year:
+        results = [m for m in results if m.get("release_date") and int(m["release_date"][:4]) >= start_year]
+    if end_year:
+        results = [m for m in results if m.get("release_date") and int(m["release_date"][:4]) <= end_year]
+    return results[:20]
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    genre_ids = [g for g, _ in GENRES]
+    print(f"{'movies':>10} {'build s':>9} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12}")
+    for n in args.sizes:
+        movies = synthetic_catalog(n)
+        started = time.perf_counter()
+        index = SearchIndex(movies)
+        build_s = time.perf_counter() - started
+
+        queries = []
+        for _ in range(args.queries):
+            words = rng.sample(WORDS, rng.randint(1, 2))
+            query = " ".join(words)
+            if rng.random() < 0.5:
+                query = query[:-2]  # search-as-you-type prefix
+            start_year = rng.choice([None, 1980, 2000])
+            queries.append((query, start_year, start_year + 15 if start_year else None, rng.choice([None] + genre_ids)))
+
+        index_ms = []
+        for q in queries:
+            started = time.perf_counter()
+            index.search(*q)
+            index_ms.append((time.perf_counter() - started) * 1000)
+        scan_ms = []
+        for q in queries[:max(1, args.queries // 20)]:
+            started = time.perf_counter()
+            linear_search(movies, *q)
+            scan_ms.append((time.perf_counter() - started) * 1000)
+
+        print(f"{n:>10} {build_s:>9.2f} {statistics.median(index_ms):>13.3f} {percentile(index_ms, 0.99):>13.3f} {statistics.median(scan_ms):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: API import time and time to first request.
+
+A synthetic model of --movies movies is published and the same number of
+movies is saved to the catalog of a temporary SQLite database, so startup
+has the usual work to do. Then, --repeat times each:
+    import         `import main` in a fresh interpreter
+    first request  from starting uvicorn until GET / answers
+    ready          from starting uvicorn until GET /ready answers 200
+                   (the model is loaded; absent before /ready existed)
+
+Reported as medians in milliseconds.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py [--movies 100000] [--repeat 5] [--json out.json] [--compare old.json]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import BACKEND_DIR, change, free_port, load_report, publish_synthetic_model, write_report
+
+IMPORT_MAIN = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def seed(tmp, database_url, n):
+    os.environ["DATABASE_URL"] = database_url
+    import models
+    from database import engine
+    ids = list(range(1000, 1000 + n))
+    titles = [f"Movie Title {i}" for i in range(n)]
+    publish_synthetic_model(os.path.join(tmp, "model"), ids, titles)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.Movie.__table__.insert(), [
+            {"id": movie_id, "title": title, "release_year": 2001, "genre_ids": [18], "popularity": 1.0, "vote_average": 5.0}
+            for movie_id, title in zip(ids, titles)])
+    engine.dispose()
+
+
+def server_env(database_url):
+    return {**os.environ, "DATABASE_URL": database_url, "MODEL_RELOAD_INTERVAL": "0", "PASSWORD_HASH_WORKERS": "0", "LOG_LEVEL": "WARNING"}
+
+
+def time_import(tmp, database_url):
+    output = subprocess.run([sys.executable, "-c", IMPORT_MAIN], cwd=tmp, env={**server_env(database_url), "PYTHONPATH": BACKEND_DIR},
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+def time_start(tmp, database_url, timeout=120):
+    """
+    Milliseconds until GET / and GET /ready first succeed (None if /ready does not exist).
+    """
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(port), "--log-level", "warning"],
+                              cwd=tmp, env=server_env(database_url), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while ready is None and time.perf_counter() - started < timeout:
+                try:
+                    if first is None and client.get("/").status_code == 200:
+                        first = (time.perf_counter() - started) * 1000
+                    if first is not None:
+                        status = client.get("/ready").status_code
+                        if status == 404:
+                            break
+                        if status == 200:
+                            ready = (time.perf_counter() - started) * 1000
+                            break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+    if first is None:
+        raise RuntimeError("API did not start")
+    return first, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="A --json file of an earlier run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.sqlite3')}"
+        seed(tmp, database_url, args.movies)
+        imports = [time_import(tmp, database_url) for _ in range(args.repeat)]
+        starts = [time_start(tmp, database_url) for _ in range(args.repeat)]
+
+    readies = [ready for _, ready in starts if ready is not None]
+    results = {
+        "import_ms": statistics.median(imports),
+        "first_request_ms": statistics.median(first for first, _ in starts),
+        "ready_ms": statistics.median(readies) if readies else None,
+    }
+    old = load_report(args.compare)["results"] if args.compare else {}
+    for name, value in results.items():
+        line = f"{name:>18} {value:>9.1f}" if value is not None else f"{name:>18} {'n/a':>9}"
+        if old.get(name) is not None:
+            line += f"   was {old[name]:>9.1f} ({change(value, old[name]) if value is not None else 'n/a'})"
+        print(line)
+    if args.json:
+        write_report(args.json, "startup", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: per-request top-k selection over one similarity row.
+
+Compares the original implementation (sort every (index, score) tuple, then
+look results up with DataFrame.iloc) with recommender.top_k plus the
+precomputed id/title arrays.
+
+Usage (from the repository root):
+    python benchmarks/bench_topk.py [--sizes 5000 50000 500000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from model_store import StringTable
+from recommender import top_k
+
+
+def legacy(movies, distances):
+    movies_list = sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])[1:6]
+    return [{"id": int(movies.iloc[i[0]].id), "title": movies.iloc[i[0]].title} for i in movies_list]
+
+
+def vectorized(ids, titles, distances, row):
+    best = top_k(distances, 5, exclude=[row])
+    return [{"id": int(ids[i]), "title": titles[i]} for i in best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'movies':>10} {'legacy ms':>12} {'top_k ms':>12} {'speedup':>9}")
+    for n in args.sizes:
+        ids = np.arange(n, dtype=np.int64) + 1
+        title_list = [f"Movie {i}" for i in range(n)]
+        movies = pd.DataFrame({"id": ids, "title": title_list})
+        titles = StringTable.from_strings(title_list)
+        distances = rng.random(n, dtype=np.float32)
+        row = int(rng.integers(n))
+        distances[row] = 1.0
+
+        assert [m["id"] for m in legacy(movies, distances)] == [m["id"] for m in vectorized(ids, titles, distances, row)]
+
+        legacy_repeat = max(1, args.repeat // 10) if n > 100_000 else args.repeat
+        legacy_ms = min(timeit.repeat(lambda: legacy(movies, distances), number=1, repeat=legacy_repeat)) * 1000
+        new_ms = min(timeit.repeat(lambda: vectorized(ids, titles, distances, row), number=1, repeat=args.repeat)) * 1000
+        print(f"{n:>10} {legacy_ms:>12.3f} {new_ms:>12.3f} {legacy_ms / new_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
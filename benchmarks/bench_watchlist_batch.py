@@ -0,0 +1,76 @@
+"""
+Throughput benchmark: importing a watchlist one item per request vs in batches.
+
+Runs the API in-process (FastAPI TestClient) against a temporary SQLite
+database and imports the same list through POST /watchlist/ and through
+POST /watchlist/batch, then removes it through DELETE /watchlist/{id} and
+DELETE /watchlist/batch. SQLite commits are cheap compared to a networked
+Postgres, so the single-item path looks better here than in production.
+
+Usage (from the repository root):
+    python benchmarks/bench_watchlist_batch.py [--items 500] [--batch-size 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def report(name, items, requests, seconds):
+    print(f"{name:>14} {items:>7} {requests:>9} {seconds:>9.3f} {items / seconds:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        os.environ["PASSWORD_HASH_WORKERS"] = "0"
+        os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+        os.chdir(tmp)
+        sys.path.insert(0, BACKEND_DIR)
+        from fastapi.testclient import TestClient
+        import main as api
+
+        with TestClient(api.app) as client:
+            client.post("/users/", json={"username": "bench", "email": "bench@example.com", "full_name": "Bench", "password": "bench1234"})
+            token = client.post("/token", data={"username": "bench", "password": "bench1234"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            items = [{"movie_id": 10_000 + i, "movie_title": f"Movie {i}"} for i in range(args.items)]
+            batches = [items[i:i + args.batch_size] for i in range(0, len(items), args.batch_size)]
+
+            print(f"{'path':>14} {'items':>7} {'requests':>9} {'seconds':>9} {'items/s':>12}")
+            ids = []
+            report("single add", len(items), len(items), timed(
+                lambda: ids.extend(client.post("/watchlist/", json=item, headers=headers).json()["id"] for item in items)))
+            report("single delete", len(ids), len(ids), timed(
+                lambda: [client.delete(f"/watchlist/{item_id}", headers=headers) for item_id in ids]))
+
+            ids = []
+
+            def add_batches():
+                for batch in batches:
+                    results = client.post("/watchlist/batch", json={"items": batch}, headers=headers).json()
+                    ids.extend(result["item"]["id"] for result in results if result["status"] == "added")
+            report("batch add", len(items), len(batches), timed(add_batches))
+            report("batch dup", len(items), len(batches), timed(
+                lambda: [client.post("/watchlist/batch", json={"items": batch}, headers=headers) for batch in batches]))
+            id_batches = [ids[i:i + args.batch_size] for i in range(0, len(ids), args.batch_size)]
+            report("batch delete", len(ids), len(id_batches), timed(
+                lambda: [client.request("DELETE", "/watchlist/batch", json={"item_ids": batch}, headers=headers) for batch in id_batches]))
+
+
+if __name__ == "__main__":
+    main()
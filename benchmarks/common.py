@@ -0,0 +1,114 @@
+"""
+Helpers shared by the benchmark scripts: percentiles, synthetic models and
+machine-readable reports.
+"""
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+from datetime import datetime, timezone
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+MODEL_DIR = os.path.join(REPO_DIR, 'Model')
+
+# ADMIN_TOKEN given to the API servers the load harnesses start, for /admin/stats
+ADMIN_TOKEN = 'benchmark-admin'
+ADMIN_HEADERS = {'X-Admin-Token': ADMIN_TOKEN}
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+def summarize(samples):
+    """
+    Count, mean and p50/p95/p99 of a list of latencies.
+    """
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def synthetic_neighbor_index(n, k=50, seed=0):
+    """
+    A random top-K neighbor table with descending scores, without the O(N^2)
+    similarity computation, for benchmarking the serving path at any size.
+    """
+    from neighbors import NeighborIndex
+
+    rng = np.random.default_rng(seed)
+    k = min(k, n - 1)
+    indices = rng.integers(0, n, size=(n, k), dtype=np.int32)
+    scores = -np.sort(-rng.random((n, k), dtype=np.float32), axis=1)
+    return NeighborIndex(indices, scores)
+
+
+def publish_synthetic_model(root, ids, titles, k=50, seed=0):
+    """
+    Publishes a synthetic model version under `root`, as the builder would.
+    """
+    import model_store
+
+    neighbor_index = synthetic_neighbor_index(len(ids), k, seed)
+    return model_store.publish_version(root, lambda directory, version: model_store.save_artifacts(
+        directory, np.asarray(ids, dtype=np.int64), list(titles), neighbor_index, extra={"version": version, "mode": "synthetic"}))
+
+
+def environment():
+    """
+    What a result depends on besides the code: interpreter, libraries, machine and commit.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit or None,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_report(path, name, config, results):
+    """
+    Saves a benchmark result as JSON, so runs can be compared with --compare.
+    """
+    with open(path, "w") as f:
+        json.dump({"benchmark": name, "config": config, "environment": environment(), "results": results}, f, indent=2)
+    print(f"✅ Results written to '{path}'")
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(new, old):
+    """
+    Relative change of a metric as a printable percentage.
+    """
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
@@ -0,0 +1,257 @@
+"""
+End-to-end load harness for the API.
+
+Starts the stub TMDB server and the API (uvicorn) as subprocesses, against a
+temporary SQLite database or the Postgres given with --database-url. A
+synthetic model built from the stub catalog is published, part of the catalog
+is saved to the local movies table, and --users accounts are created with
+--watchlist movies each. Then --concurrency virtual users loop for --duration
+seconds, each picking its next request from a weighted mix:
+    token            POST /token (argon2 verification)
+    watchlist        GET /watchlist/?limit=50
+    watchlist_add    POST /watchlist/ (invalidates cached recommendations)
+    recommendations  GET /recommendations/ (latest and blend)
+    search           GET /movies/search
+    popular          GET /movies/popular
+    details          GET /movies/{id} (local catalog, or TMDB for the rest)
+
+Requests finished during the first --warmup seconds are not counted.
+Throughput and p50/p95/p99 are reported per request type. Choices come from
+seeded generators, so two runs send the same sequence of requests per virtual
+user. Use --json to keep a run and --compare to diff a later one against it.
+
+Usage (from the repository root):
+    python benchmarks/load_api.py [--concurrency 16] [--duration 20] [--users 20] [--database-url postgresql://...]
+        [--mix token=1,watchlist=4,...] [--json out.json] [--compare old.json]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import ADMIN_HEADERS, ADMIN_TOKEN, BACKEND_DIR, BENCHMARKS_DIR, change, free_port, load_report, publish_synthetic_model, summarize, write_report
+from stub_tmdb import WORDS, Catalog
+
+DEFAULT_MIX = "token=1,watchlist=4,watchlist_add=1,recommendations=4,search=2,popular=1,details=3"
+PASSWORD = "loadtest1234"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown request type in --mix: {name} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --- Request types ---
+# Each takes (client, rng, user, catalog) and returns the response.
+
+async def token(client, rng, user, catalog):
+    return await client.post("/token", data={"username": user["username"], "password": PASSWORD})
+
+
+async def watchlist(client, rng, user, catalog):
+    return await client.get("/watchlist/", params={"limit": 50}, headers=user["headers"])
+
+
+async def watchlist_add(client, rng, user, catalog):
+    movie = rng.choice(catalog.movies)
+    return await client.post("/watchlist/", json={"movie_id": movie["id"], "movie_title": movie["title"]}, headers=user["headers"])
+
+
+async def recommendations(client, rng, user, catalog):
+    return await client.get("/recommendations/", params={"strategy": rng.choice(("latest", "blend"))}, headers=user["headers"])
+
+
+async def search(client, rng, user, catalog):
+    return await client.get("/movies/search", params={"query": rng.choice(WORDS)})
+
+
+async def popular(client, rng, user, catalog):
+    return await client.get("/movies/popular")
+
+
+async def details(client, rng, user, catalog):
+    return await client.get(f"/movies/{rng.choice(catalog.movies)['id']}")
+
+
+SCENARIOS = {f.__name__: f for f in (token, watchlist, watchlist_add, recommendations, search, popular, details)}
+
+
+# --- Setup ---
+
+def seed_catalog(database_url, catalog, fraction):
+    """
+    Saves the first `fraction` of the stub catalog to the movies table, as a model build would.
+    """
+    os.environ["DATABASE_URL"] = database_url
+    import models
+    import crud
+    from database import SessionLocal, engine
+    models.Base.metadata.create_all(bind=engine)
+    movies = catalog.movies[:int(len(catalog.movies) * fraction)]
+    with SessionLocal() as db:
+        crud.upsert_movies(db, [catalog.details(movie, ["credits", "keywords"]) for movie in movies])
+    engine.dispose()
+
+
+def start_process(args, env=None, cwd=None):
+    return subprocess.Popen([sys.executable, *args], cwd=cwd, env={**os.environ, **(env or {})}, stdout=subprocess.DEVNULL)
+
+
+async def wait_ready(client, path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(path)).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{client.base_url} did not start")
+
+
+async def create_users(client, args, catalog):
+    rng = random.Random(args.seed)
+    users = []
+    for i in range(args.users):
+        username = f"load{i}"
+        response = await client.post("/users/", json={"username": username, "email": f"{username}@example.com", "full_name": f"Load {i}", "password": PASSWORD})
+        if response.status_code not in (200, 400):
+            response.raise_for_status()
+        access_token = (await client.post("/token", data={"username": username, "password": PASSWORD})).json()["access_token"]
+        user = {"username": username, "headers": {"Authorization": f"Bearer {access_token}"}}
+        items = [{"movie_id": m["id"], "movie_title": m["title"]} for m in rng.sample(catalog.movies, min(args.watchlist, len(catalog.movies)))]
+        (await client.post("/watchlist/batch", json={"items": items}, headers=user["headers"])).raise_for_status()
+        users.append(user)
+    return users
+
+
+# --- Load ---
+
+async def virtual_user(index, client, args, mix, users, catalog, measure_from, stop, samples, statuses):
+    rng = random.Random(args.seed * 1000 + index)
+    names = list(mix)
+    weights = list(mix.values())
+    while not stop.is_set():
+        name = rng.choices(names, weights)[0]
+        user = rng.choice(users)
+        started = time.perf_counter()
+        try:
+            status = (await SCENARIOS[name](client, rng, user, catalog)).status_code
+        except httpx.HTTPError:
+            status = "error"
+        finished = time.perf_counter()
+        if finished >= measure_from:
+            samples.setdefault(name, []).append((finished - started) * 1000)
+            counts = statuses.setdefault(name, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+
+async def run_load(client, args, mix, users, catalog):
+    stop = asyncio.Event()
+    samples, statuses = {}, {}
+    measure_from = time.perf_counter() + args.warmup
+    tasks = [asyncio.create_task(virtual_user(i, client, args, mix, users, catalog, measure_from, stop, samples, statuses))
+             for i in range(args.concurrency)]
+    await asyncio.sleep(args.warmup + args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    results = {}
+    for name in mix:
+        stats = summarize(samples.get(name, []))
+        stats["rps"] = stats["count"] / args.duration
+        stats["statuses"] = statuses.get(name, {})
+        results[name] = stats
+    total = sum(len(values) for values in samples.values())
+    results["all"] = {**summarize([ms for values in samples.values() for ms in values]), "rps": total / args.duration}
+    return results
+
+
+def print_results(results, baseline):
+    print(f"{'request':>16} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses" + ("  (req/s, p95 vs old)" if baseline else ""))
+    for name, stats in results.items():
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(stats.get("statuses", {}).items()))
+        line = f"{name:>16} {stats['count']:>7} {stats['rps']:>8.1f} {stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f}  {statuses}"
+        old = baseline.get(name)
+        if old:
+            line += f"  ({change(stats['rps'], old['rps'])}, {change(stats['p95'], old['p95'])})"
+        print(line)
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    catalog = Catalog(args.movies)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'load.sqlite3')}"
+        seed_catalog(database_url, catalog, args.catalog_fraction)
+        publish_synthetic_model(os.path.join(tmp, "model"), [m["id"] for m in catalog.movies], [m["title"] for m in catalog.movies], seed=args.seed)
+
+        tmdb_port, api_port = free_port(), free_port()
+        stub = start_process([os.path.join(BENCHMARKS_DIR, "stub_tmdb.py"), "--port", str(tmdb_port), "--movies", str(args.movies), "--latency-ms", str(args.tmdb_latency_ms)])
+        env = {
+            "DATABASE_URL": database_url,
+            "API_KEY": "load-test",
+            "TMDB_BASE_URL": f"http://127.0.0.1:{tmdb_port}",
+            "MODEL_RELOAD_INTERVAL": "0",
+            "ADMIN_TOKEN": ADMIN_TOKEN,
+            "LOG_LEVEL": "WARNING",
+            # Under load, slow-request warnings would only interleave with the report
+            "SLOW_REQUEST_MS": "0",
+        }
+        if args.hash_workers is not None:
+            env["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+        # The API runs in the temporary directory so it opens the synthetic model
+        api = start_process(["-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(api_port), "--workers", str(args.workers), "--log-level", "warning"], env=env, cwd=tmp)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency + 4)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", limits=limits, timeout=60) as client:
+                # /ready answers 503 until the model is loaded
+                await wait_ready(client, "/ready")
+                users = await create_users(client, args, catalog)
+                print(f"{args.concurrency} virtual users, {args.users} accounts, {args.movies} movies, {args.warmup}s warm-up + {args.duration}s, database {'postgres' if args.database_url else 'sqlite'}")
+                results = await run_load(client, args, mix, users, catalog)
+                server_stats = (await client.get("/admin/stats", headers=ADMIN_HEADERS)).json()
+        finally:
+            api.terminate()
+            stub.terminate()
+            api.wait()
+            stub.wait()
+
+    baseline = load_report(args.compare)["results"] if args.compare else {}
+    print_results(results, baseline)
+    if args.json:
+        write_report(args.json, "load_api", {**vars(args), "database_url": "postgres" if args.database_url else "sqlite"}, {**results, "server": server_stats})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--watchlist", type=int, default=30)
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--catalog-fraction", type=float, default=0.5, help="Share of the catalog saved locally; /movies/{id} asks TMDB for the rest")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--database-url", help="Default: a temporary SQLite file. A Postgres database must be empty or disposable.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--hash-workers", type=int, default=None, help="Default: the server's PASSWORD_HASH_WORKERS")
+    parser.add_argument("--tmdb-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results of an earlier run to compare with")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
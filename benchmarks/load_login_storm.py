@@ -0,0 +1,123 @@
+"""
+Load test: /watchlist/ latency while a login storm hits /token.
+
+Starts the API with uvicorn against a temporary SQLite database, measures
+GET /watchlist/ with a few steady readers, then again while many clients log
+in concurrently. Run it once with the default hashing pool and once with
+--hash-workers 0 (argon2 in the shared threadpool, the old behaviour) to
+compare.
+
+Usage (from the repository root):
+    python benchmarks/load_login_storm.py [--hash-workers N] [--readers 4] [--logins 64] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import ADMIN_HEADERS, ADMIN_TOKEN, BACKEND_DIR, free_port, percentile
+
+PASSWORD = "storm1234"
+
+
+def start_server(tmp, port, hash_workers, queue_limit):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'storm.sqlite3')}",
+        "PASSWORD_HASH_QUEUE_LIMIT": str(queue_limit),
+        "MODEL_RELOAD_INTERVAL": "0",
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+    }
+    if hash_workers is not None:
+        env["PASSWORD_HASH_WORKERS"] = str(hash_workers)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+async def reader(client, headers, stop, timings):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/watchlist/", headers=headers)
+        response.raise_for_status()
+        timings.append((time.perf_counter() - started) * 1000)
+
+
+async def login(client, stop, outcomes, timings):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post("/token", data={"username": "storm", "password": PASSWORD})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            timings.append((time.perf_counter() - started) * 1000)
+        elif response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+
+async def phase(client, headers, readers, logins, duration):
+    stop = asyncio.Event()
+    read_ms, login_ms, outcomes = [], [], {}
+    tasks = [asyncio.create_task(reader(client, headers, stop, read_ms)) for _ in range(readers)]
+    tasks += [asyncio.create_task(login(client, stop, outcomes, login_ms)) for _ in range(logins)]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return read_ms, login_ms, outcomes
+
+
+async def run(args):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(tmp, port, args.hash_workers, args.queue_limit)
+        try:
+            limits = httpx.Limits(max_connections=args.readers + args.logins + 4)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+                await wait_ready(client)
+                await client.post("/users/", json={"username": "storm", "email": "storm@example.com", "full_name": "Storm", "password": PASSWORD})
+                token = (await client.post("/token", data={"username": "storm", "password": PASSWORD})).json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+                await client.post("/watchlist/", json={"movie_id": 550, "movie_title": "Fight Club"}, headers=headers)
+
+                print(f"hash workers: {'default' if args.hash_workers is None else args.hash_workers}, readers: {args.readers}, login clients: {args.logins}, {args.duration}s per phase")
+                print(f"{'phase':>10} {'reads':>7} {'read p50':>9} {'read p99':>9} {'logins ok':>10} {'login p50':>10} {'503s':>6}")
+                for name, logins in (("baseline", 0), ("storm", args.logins)):
+                    read_ms, login_ms, outcomes = await phase(client, headers, args.readers, logins, args.duration)
+                    print(f"{name:>10} {len(read_ms):>7} {statistics.median(read_ms):>9.1f} {percentile(read_ms, 0.99):>9.1f} "
+                          f"{outcomes.get(200, 0):>10} {percentile(login_ms, 0.5):>10.1f} {outcomes.get(503, 0):>6}")
+                print("password_hashing:", (await client.get("/admin/stats", headers=ADMIN_HEADERS)).json()["password_hashing"])
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hash-workers", type=int, default=None, help="Default: the server's PASSWORD_HASH_WORKERS")
+    parser.add_argument("--queue-limit", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
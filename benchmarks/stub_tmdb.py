@@ -0,0 +1,206 @@
+"""
+Local fake TMDB server for tests, benchmarks and offline development.
+
+Serves deterministic synthetic data for the endpoints the app and the model
+builder use:
+    /movie/popular?page=N
+    /search/movie?query=...&page=N
+    /movie/{id}[?append_to_response=credits,keywords]
+    /movie/changes?start_date=...&end_date=...&page=N (at most 14 days, like TMDB)
+
+Usage:
+    python benchmarks/stub_tmdb.py [--port 8765] [--movies 5000] [--latency-ms 0]
+then point the app at it with TMDB_BASE_URL=http://127.0.0.1:8765 and any API_KEY.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = [(28, "Action"), (12, "Adventure"), (16, "Animation"), (35, "Comedy"), (80, "Crime"),
+          (18, "Drama"), (14, "Fantasy"), (27, "Horror"), (9648, "Mystery"), (10749, "Romance"),
+          (878, "Science Fiction"), (53, "Thriller")]
+WORDS = ["night", "star", "lost", "city", "dark", "love", "war", "river", "ghost", "king",
+         "last", "secret", "blue", "iron", "summer", "shadow", "return", "dream", "wild", "heart"]
+PAGE_SIZE = 20
+
+
+class Catalog:
+    """
+    Synthetic movie catalog; the same seed always produces the same movies.
+    """
+
+    def __init__(self, size, seed=0):
+        rng = random.Random(seed)
+        self.movies = []
+        for i in range(size):
+            genres = rng.sample(GENRES, rng.randint(1, 3))
+            title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 3))) + f" {i}"
+            self.movies.append({
+                "id": 1000 + i,
+                "title": title,
+                "overview": " ".join(rng.choice(WORDS) for _ in range(25)),
+                "release_date": f"{rng.randint(1960, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "genre_ids": [g for g, _ in genres],
+                "genres": [{"id": g, "name": name} for g, name in genres],
+                "poster_path": f"/poster{i}.jpg",
+                "popularity": round(rng.random() * 100, 3),
+                "vote_average": round(rng.random() * 10, 1),
+                "keywords": {"keywords": [{"id": j, "name": rng.choice(WORDS)} for j in range(5)]},
+                "credits": {
+                    "cast": [{"name": f"Actor {rng.randint(1, size // 3 + 1)}"} for _ in range(5)],
+                    "crew": [{"name": f"Director {rng.randint(1, size // 10 + 1)}", "job": "Director"}],
+                },
+            })
+        self.by_id = {m["id"]: m for m in self.movies}
+
+    @staticmethod
+    def summary(movie):
+        return {k: movie[k] for k in ("id", "title", "overview", "release_date", "genre_ids", "poster_path", "popularity", "vote_average")}
+
+    def page(self, movies, page):
+        start = (page - 1) * PAGE_SIZE
+        return {
+            "page": page,
+            "results": [self.summary(m) for m in movies[start:start + PAGE_SIZE]],
+            "total_pages": max(1, -(-len(movies) // PAGE_SIZE)),
+            "total_results": len(movies),
+        }
+
+    def details(self, movie, append):
+        data = {k: v for k, v in movie.items() if k not in ("genre_ids", "keywords", "credits")}
+        for extra in append:
+            if extra in ("keywords", "credits"):
+                data[extra] = movie[extra]
+        return data
+
+
+class StubTMDBServer:
+    """
+    Runs the fake TMDB API in a background thread.
+
+    `latency` adds a fixed delay to every response and `fail_every` makes every
+    n-th request fail with HTTP 500, to exercise timeouts and retries.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, movies=1000, latency=0.0, fail_every=0):
+        self.catalog = Catalog(movies)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    count = server.requests
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.fail_every and count % server.fail_every == 0:
+                    return self._send(500, {"status_message": "Injected failure"})
+                status, body = server.route(self.path)
+                self._send(status, body)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def route(self, raw_path):
+        url = urlparse(raw_path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if "api_key" not in params:
+            return 401, {"status_message": "Invalid API key"}
+        path = url.path.rstrip("/")
+        if path.startswith("/3/"):
+            path = path[2:]
+        page = int(params.get("page", 1))
+        catalog = self.catalog
+        if path == "/movie/popular":
+            return 200, catalog.page(catalog.movies, page)
+        if path == "/search/movie":
+            query = params.get("query", "").lower()
+            return 200, catalog.page([m for m in catalog.movies if query in m["title"].lower()], page)
+        if path == "/movie/changes":
+            try:
+                start = date.fromisoformat(params["start_date"]) if "start_date" in params else None
+                end = date.fromisoformat(params["end_date"]) if "end_date" in params else None
+            except ValueError:
+                return 422, {"status_message": "Invalid date."}
+            if start is not None and (end or date.today()) - start > timedelta(days=14):
+                return 422, {"status_message": "Invalid date range: Should be a range no longer than 14 days."}
+            # A fixed 2% of the catalog is reported as recently changed
+            changed = [{"id": m["id"], "adult": False} for m in catalog.movies[::50]]
+            start = (page - 1) * 100
+            return 200, {"results": changed[start:start + 100], "page": page,
+                         "total_pages": max(1, -(-len(changed) // 100)), "total_results": len(changed)}
+        if path.startswith("/movie/"):
+            try:
+                movie = catalog.by_id.get(int(path.rsplit("/", 1)[1]))
+            except ValueError:
+                movie = None
+            if movie is None:
+                return 404, {"status_message": "The resource you requested could not be found."}
+            append = [a for a in params.get("append_to_response", "").split(",") if a]
+            return 200, catalog.details(movie, append)
+        return 404, {"status_message": "Unknown endpoint"}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake TMDB API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubTMDBServer(args.host, args.port, args.movies, args.latency_ms / 1000, args.fail_every)
+    print(f"Fake TMDB serving {args.movies} movies on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()